@@ -0,0 +1,266 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+from local_s3 import LocalS3Client
+from metrics import HISTOGRAMS
+from security_matcher import SQL_INJECTION_RULES, SecurityPatternSet
+from templating import DEFAULT_MAX_TEMPLATES
+
+# Example patterns in the shape returned by prompt_for_security_patterns
+EXAMPLE_SECURITY_PATTERNS = [
+    r"/etc/passwd",
+    r"\.\./",
+    r"(?i)<script\b",
+    r"(?i)webshell|cmd=",
+    r"(?i)wp-admin|phpmyadmin",
+]
+
+_BENIGN_REQUESTS = [
+    '"GET /home HTTP/1.1" 200 1043',
+    '"POST /login HTTP/1.1" 302 876',
+    '"GET /dashboard HTTP/1.1" 200 2048',
+    '"GET /profile HTTP/1.1" 200 1500',
+    '"POST /api/data HTTP/1.1" 201 1328',
+    '"DELETE /api/item/123 HTTP/1.1" 204 0',
+    '"PUT /api/item/456 HTTP/1.1" 200 1024',
+    '"GET /static/app.js?v=3 HTTP/1.1" 200 53211',
+]
+
+_ATTACK_REQUESTS = [
+    '"GET /api/user?id=1\' OR \'1\'=\'1 HTTP/1.1" 500 1032',
+    '"GET /api/user?id=1\' UNION SELECT password FROM users-- HTTP/1.1" 500 1045',
+    '"GET /etc/passwd HTTP/1.1" 403 890',
+    '"GET /uploads/webshell.php?cmd=ls HTTP/1.1" 200 212',
+    '"GET /wp-admin/setup-config.php HTTP/1.1" 404 321',
+]
+
+
+_REFERERS = ['"-"', '"https://example.com/"', '"https://example.com/search?q=shoes"']
+_USER_AGENTS = ['"Mozilla/5.0 (X11; Linux x86_64)"', '"curl/8.5.0"', '"sqlmap/1.7"']
+
+
+def generate_apache_lines(count: int, attack_ratio: float = 0.01, seed: int = 0,
+                          combined_ratio: float = 0.0) -> List[str]:
+    """Generate synthetic Common (and optionally Combined) Log Format lines shaped like samples/logs"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        ip = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        timestamp = f"06/Apr/2025:{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d} +0000"
+        requests = _ATTACK_REQUESTS if rng.random() < attack_ratio else _BENIGN_REQUESTS
+        line = f"{ip} - - [{timestamp}] {rng.choice(requests)}"
+        if combined_ratio and rng.random() < combined_ratio:
+            line = f"{line} {rng.choice(_REFERERS)} {rng.choice(_USER_AGENTS)}"
+        lines.append(line)
+    return lines
+
+
+_SYSLOG_HOSTS = ["web01", "web02", "db01", "bastion"]
+
+_BENIGN_SYSLOG = [
+    "sshd[{pid}]: Accepted publickey for deploy from {ip} port {port} ssh2",
+    "CRON[{pid}]: (root) CMD (/usr/local/bin/backup.sh)",
+    "systemd[1]: Started Session {pid} of user deploy.",
+    "nginx[{pid}]: GET /health 200",
+    "kernel: [{pid}.123456] eth0: link up",
+]
+
+_ATTACK_SYSLOG = [
+    "sshd[{pid}]: error: maximum authentication attempts exceeded for root from {ip} port {port} ssh2",
+    "sudo[{pid}]: www-data : command not allowed ; COMMAND=/bin/cat /etc/passwd",
+    "httpd[{pid}]: GET /uploads/webshell.php?cmd=id from {ip}",
+    "app[{pid}]: query failed: SELECT * FROM users WHERE name='' OR '1'='1'",
+]
+
+_BENIGN_JSON = [
+    {"level": "info", "message": "request completed", "path": "/home", "status": 200},
+    {"level": "info", "message": "user logged in", "path": "/login", "status": 302},
+    {"level": "debug", "message": "cache hit", "path": "/static/app.js", "status": 200},
+]
+
+_ATTACK_JSON = [
+    {"level": "error", "message": "query failed: id=1' UNION SELECT password FROM users--", "path": "/api/user", "status": 500},
+    {"level": "warning", "message": "path traversal blocked: ../../etc/passwd", "path": "/download", "status": 403},
+    {"level": "critical", "message": "webshell upload detected", "path": "/uploads/webshell.php", "status": 200},
+]
+
+
+def _random_ip(rng: random.Random) -> str:
+    return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+def generate_syslog_lines(count: int, attack_ratio: float = 0.01, seed: int = 0) -> List[str]:
+    """Generate synthetic BSD syslog lines (sshd, sudo, cron...)"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        timestamp = f"Apr  6 {(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}"
+        messages = _ATTACK_SYSLOG if rng.random() < attack_ratio else _BENIGN_SYSLOG
+        message = rng.choice(messages).format(pid=rng.randint(100, 65000), ip=_random_ip(rng),
+                                              port=rng.randint(1024, 65535))
+        lines.append(f"{timestamp} {rng.choice(_SYSLOG_HOSTS)} {message}")
+    return lines
+
+
+def generate_json_lines(count: int, attack_ratio: float = 0.01, seed: int = 0) -> List[str]:
+    """Generate synthetic JSON-lines application logs with a "level" field"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        records = _ATTACK_JSON if rng.random() < attack_ratio else _BENIGN_JSON
+        record = dict(rng.choice(records), timestamp=f"2025-04-06T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}Z",
+                      client_ip=_random_ip(rng))
+        lines.append(json.dumps(record))
+    return lines
+
+
+GENERATORS: Dict[str, Callable[..., List[str]]] = {
+    "apache": lambda count, attack_ratio, seed: generate_apache_lines(count, attack_ratio, seed, combined_ratio=0.5),
+    "syslog": generate_syslog_lines,
+    "json": generate_json_lines,
+}
+
+
+def legacy_match(lines: List[str], security_patterns: List[str]) -> int:
+    """Security matching as analyze_logs did it before SecurityPatternSet"""
+    matched = 0
+    for entry in lines:
+        sql_injection_patterns = list(SQL_INJECTION_RULES.values())
+        if any(re.search(pattern, entry, re.IGNORECASE) for pattern in security_patterns + sql_injection_patterns):
+            matched += 1
+    return matched
+
+
+def pattern_set_match(lines: List[str], security_patterns: List[str], prefilter: bool = True) -> int:
+    matcher = SecurityPatternSet.from_patterns(security_patterns, prefilter=prefilter)
+    return sum(1 for entry in lines if matcher.search(entry))
+
+
+def pattern_set_scan(lines: List[str], security_patterns: List[str]) -> int:
+    matcher = SecurityPatternSet.from_patterns(security_patterns)
+    return sum(1 for entry in lines if matcher.scan(entry) is not None)
+
+
+def _time(label: str, func: Callable[[], int], line_count: int) -> float:
+    start = time.perf_counter()
+    matched = func()
+    elapsed = time.perf_counter() - start
+    rate = line_count / elapsed if elapsed else float("inf")
+    print(f"{label:<26} {elapsed:8.2f}s {rate:14,.0f} lines/sec  ({matched} matched)")
+    return rate
+
+
+def bench_matcher(args):
+    lines = generate_apache_lines(args.lines, args.attack_ratio, args.seed)
+    print(f"Security matching over {len(lines):,} lines, {len(EXAMPLE_SECURITY_PATTERNS)} patterns + SQL injection rules")
+    before = _time("re.search per pattern", lambda: legacy_match(lines, EXAMPLE_SECURITY_PATTERNS), len(lines))
+    _time("search, no prefilter", lambda: pattern_set_match(lines, EXAMPLE_SECURITY_PATTERNS, False), len(lines))
+    after = _time("search, literal prefilter", lambda: pattern_set_match(lines, EXAMPLE_SECURITY_PATTERNS), len(lines))
+    _time("scan (rule ids + spans)", lambda: pattern_set_scan(lines, EXAMPLE_SECURITY_PATTERNS), len(lines))
+    print(f"Speedup (search vs re.search): {after / before:.2f}x")
+
+
+def _peak_rss_mib() -> float:
+    # Linux keeps ru_maxrss across exec, so a spawned process would report its parent's peak;
+    # VmHWM is the high-water mark of this process's own address space
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # In KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2 ** 20 if sys.platform == "darwin" else maxrss / 1024
+
+
+def _run_analyzer(source: str, root_dir: str, key: str, options: Dict) -> Dict:
+    """Run one analysis in a fresh process, so that its peak RSS is its own"""
+    # The Bedrock client is created but never called: security patterns are fixed
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    from log_analyzer import LogAnalyzer
+
+    bucket = "bench"
+    analyzer = LogAnalyzer(bucket, key, s3_client=LocalS3Client(root_dir), security_patterns=EXAMPLE_SECURITY_PATTERNS,
+                           local_path=os.path.join(root_dir, bucket, key) if source == "local" else None, **options)
+    start = time.perf_counter()
+    critical_entries = analyzer.analyze_logs()
+    seconds = time.perf_counter() - start
+    # Stage latencies as the pipeline records them: the analyzer's own plus those of its scans
+    if critical_entries.metrics is not None:
+        analyzer.metrics.merge(critical_entries.metrics)
+    return {"seconds": seconds, "critical": len(critical_entries), "peak_rss": _peak_rss_mib(),
+            "metrics": analyzer.metrics}
+
+
+def _print_stages(metrics):
+    """Total time of each pipeline stage, from the analyzer's metrics (see metrics.HISTOGRAMS)"""
+    for stage in HISTOGRAMS:
+        histogram = metrics.histograms.get(stage)
+        if histogram is not None:
+            print(f"  {stage:<26} {histogram.sum:8.2f}s  ({histogram.count} calls)")
+
+
+def bench_analyzer(args):
+    lines = GENERATORS[args.format](args.lines, args.attack_ratio, args.seed)
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    options = {"workers": args.workers, "max_templates": DEFAULT_MAX_TEMPLATES if args.templates else None}
+    print(f"LogAnalyzer.analyze_logs over {len(lines):,} {args.format} lines ({len(data) / 2 ** 20:.1f} MiB), "
+          f"attack ratio {args.attack_ratio}, workers {args.workers}, templates {'on' if args.templates else 'off'}")
+
+    with tempfile.TemporaryDirectory() as root_dir:
+        key = f"synthetic.{args.format}.log"
+        os.makedirs(os.path.join(root_dir, "bench"))
+        with open(os.path.join(root_dir, "bench", key), "wb") as f:
+            f.write(data)
+
+        spawn = multiprocessing.get_context("spawn")
+        for source in args.sources:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                result = executor.submit(_run_analyzer, source, root_dir, key, options).result()
+            rate = len(lines) / result["seconds"] if result["seconds"] else float("inf")
+            print(f"{source:<26} {result['seconds']:8.2f}s {rate:14,.0f} lines/sec  "
+                  f"peak RSS {result['peak_rss']:7.1f} MiB  ({result['critical']} critical)")
+            # insight_seconds is part of scan_seconds; with --workers, scan time is summed across workers
+            _print_stages(result["metrics"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log analyzer micro-benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    matcher = subparsers.add_parser("matcher", help="Security pattern matching throughput")
+    matcher.add_argument("--lines", type=int, default=1_000_000)
+    matcher.add_argument("--attack-ratio", type=float, default=0.01)
+    matcher.add_argument("--seed", type=int, default=0)
+    matcher.set_defaults(func=bench_matcher)
+
+    analyzer = subparsers.add_parser("analyzer", help="End-to-end LogAnalyzer throughput on synthetic logs")
+    analyzer.add_argument("--format", choices=sorted(GENERATORS), default="apache")
+    analyzer.add_argument("--lines", type=int, default=1_000_000)
+    analyzer.add_argument("--attack-ratio", type=float, default=0.01)
+    analyzer.add_argument("--seed", type=int, default=0)
+    analyzer.add_argument("--workers", type=int, default=1)
+    analyzer.add_argument("--templates", action="store_true",
+                          help="Evaluate lines sharing a template once (templating.LogTemplater)")
+    analyzer.add_argument("--sources", nargs="+", choices=("s3", "local"), default=["s3", "local"],
+                          help="Read through the local S3 stand-in, the local file path, or both")
+    analyzer.set_defaults(func=bench_analyzer)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Callable, Iterator, List
+
+
+class BoundedFutures:
+    """
+    Tasks submitted to an executor with at most `limit` of them in flight.
+
+    A producer that submits work faster than it completes (ranges, blocks, objects,
+    upload parts) only holds `limit` tasks and their results in memory. Futures are
+    handed back in submission order, so results are merged deterministically.
+    """
+
+    def __init__(self, executor: Executor, limit: int):
+        self.executor = executor
+        self.limit = max(1, limit)
+        self._pending: "deque[Future]" = deque()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, fn: Callable, *args) -> List[Future]:
+        """Submit fn(*args) and return the oldest futures to wait on to get back under the limit"""
+        self._pending.append(self.executor.submit(fn, *args))
+        ready = []
+        while len(self._pending) >= self.limit:
+            ready.append(self._pending.popleft())
+        return ready
+
+    def drain(self) -> Iterator[Future]:
+        """The remaining futures, oldest first"""
+        while self._pending:
+            yield self._pending.popleft()
+
+    def cancel(self):
+        """Cancel the tasks that have not started, e.g. when the consumer stops early"""
+        for future in self._pending:
+            future.cancel()
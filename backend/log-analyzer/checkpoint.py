@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from parsed_log_batch import ParsedLogBatch
+
+# Bytes before the checkpoint offset hashed to detect that an object was rewritten rather than appended to
+TAIL_DIGEST_SIZE = 4096
+
+
+class Checkpoint(NamedTuple):
+    """Resume point of an incremental analysis of one object"""
+    etag: str
+    offset: int
+    tail_digest: str
+    format_detection: Dict
+    aggregates: Dict
+
+
+def tail_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def merge_aggregates(aggregates: Optional[Dict], batch: ParsedLogBatch) -> Dict:
+    """Add the critical entries of a batch to the running totals of previous runs"""
+    aggregates = dict(aggregates or {"runs": 0, "critical_events": 0, "critical_events_by_severity": {}})
+    by_severity = dict(aggregates["critical_events_by_severity"])
+    for severity, lines in batch.lines_by_severity().items():
+        by_severity[severity] = by_severity.get(severity, 0) + lines
+    aggregates["runs"] += 1
+    aggregates["critical_events"] += batch.line_count()
+    aggregates["critical_events_by_severity"] = by_severity
+    return aggregates
+
+
+class CheckpointStore:
+    """
+    JSON file of checkpoints keyed by bucket and key.
+
+    Writes go through a temporary file and an atomic rename, so an interrupted run
+    leaves the previous checkpoints intact. Safe to share between threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._checkpoints: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._checkpoints = json.load(f)
+
+    @staticmethod
+    def _id(bucket: str, key: str) -> str:
+        return f"s3://{bucket}/{key}"
+
+    def get(self, bucket: str, key: str) -> Optional[Checkpoint]:
+        with self._lock:
+            checkpoint = self._checkpoints.get(self._id(bucket, key))
+        return Checkpoint(**checkpoint) if checkpoint is not None else None
+
+    def put(self, bucket: str, key: str, checkpoint: Checkpoint):
+        with self._lock:
+            self._checkpoints[self._id(bucket, key)] = checkpoint._asdict()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._checkpoints, f, indent=2)
+            os.replace(tmp_path, self.path)
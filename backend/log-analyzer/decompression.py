@@ -0,0 +1,90 @@
+import bz2
+import gzip
+from typing import BinaryIO, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codec name -> (file extensions, magic bytes at the start of the stream)
+CODECS = {
+    "gzip": ((".gz", ".gzip"), b"\x1f\x8b"),
+    "zstd": ((".zst", ".zstd"), b"\x28\xb5\x2f\xfd"),
+    "bz2": ((".bz2",), b"BZh"),
+}
+MAGIC_SIZE = max(len(magic) for _, magic in CODECS.values())
+
+
+def codec_from_key(key: str) -> Optional[str]:
+    """Guess the compression codec from an object key or file name"""
+    lowered = key.lower()
+    for codec, (extensions, _) in CODECS.items():
+        if lowered.endswith(extensions):
+            return codec
+    return None
+
+
+def codec_from_magic(head: bytes) -> Optional[str]:
+    """Detect the compression codec from the first bytes of a stream"""
+    for codec, (_, magic) in CODECS.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+class _PrefixedStream:
+    """Read-only stream that replays bytes already consumed (for sniffing) before the rest of the body"""
+
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, amt: int = -1) -> bytes:
+        if not self.prefix:
+            return self.stream.read(amt)
+        if amt is None or amt < 0:
+            data, self.prefix = self.prefix + self.stream.read(), b""
+            return data
+        data, self.prefix = self.prefix[:amt], self.prefix[amt:]
+        if len(data) < amt:
+            data += self.stream.read(amt - len(data))
+        return data
+
+    def close(self):
+        self.stream.close()
+
+
+def sniff_codec(stream: BinaryIO, key: str = "") -> Tuple[Optional[str], BinaryIO]:
+    """
+    Detect the codec of a stream from the key extension, or else from its magic bytes.
+
+    Returns (codec or None, stream); the returned stream must be used instead of the
+    original since sniffing consumes the first bytes.
+    """
+    codec = codec_from_key(key)
+    if codec is not None:
+        return codec, stream
+    head = stream.read(MAGIC_SIZE)
+    return codec_from_magic(head), _PrefixedStream(head, stream)
+
+
+def decompressing_stream(stream: BinaryIO, codec: Optional[str]) -> BinaryIO:
+    """Wrap a binary stream so that read() returns decompressed bytes, decoding incrementally"""
+    if codec is None:
+        return stream
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if codec == "bz2":
+        return bz2.BZ2File(stream, mode="rb")
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compressed logs require the 'zstandard' package")
+        return zstandard.ZstdDecompressor().stream_reader(stream, closefd=True)
+    raise ValueError(f"Unsupported compression codec: {codec}")
+
+
+def open_decompressed(stream: BinaryIO, key: str = "") -> BinaryIO:
+    """Detect the codec of `stream` and return a stream of its decompressed bytes"""
+    codec, stream = sniff_codec(stream, key)
+    return decompressing_stream(stream, codec)
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from log_sources import DEFAULT_CHUNK_SIZE, LineReader
+from range_fetch import object_size
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Yielded by the follow sources each time they find no new data, before waiting a poll
+# interval: an empty line, which scanners skip and which ends a pending multiline record
+IDLE = b""
+
+
+def _wait(stop: Optional[threading.Event], interval: float):
+    if stop is not None:
+        stop.wait(interval)
+    else:
+        time.sleep(interval)
+
+
+def _running(stop: Optional[threading.Event]) -> bool:
+    return stop is None or not stop.is_set()
+
+
+def follow_file_lines(path: str, poll_interval: float = DEFAULT_POLL_INTERVAL, start: int = 0,
+                      stop: Optional[threading.Event] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield complete lines appended to a local file, polling for new data like `tail -F`.
+
+    A partially written last line is held back until its newline arrives. If the file is
+    truncated or replaced (log rotation) it is reopened and read from the start. IDLE is
+    yielded whenever there is no new data.
+    """
+    f = open(path, "rb")
+    f.seek(start)
+    pending = b""
+    try:
+        while _running(stop):
+            chunk = f.read(chunk_size)
+            if chunk:
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    yield line[:-1] if line.endswith(b"\r") else line
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            if stat is not None and (stat.st_ino != os.fstat(f.fileno()).st_ino or stat.st_size < f.tell()):
+                f.close()
+                f = open(path, "rb")
+                pending = b""
+                continue
+            yield IDLE
+            _wait(stop, poll_interval)
+    finally:
+        f.close()
+
+
+def follow_s3_lines(s3_client, bucket: str, key: str, poll_interval: float = DEFAULT_POLL_INTERVAL, start: int = 0,
+                    stop: Optional[threading.Event] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield complete lines appended to an S3 object, polling its size and fetching the new tail with ranged GETs.
+
+    If the object shrinks it was rewritten, and it is read again from the start. IDLE is
+    yielded whenever there is no new data.
+    """
+    offset = start
+    while _running(stop):
+        size = object_size(s3_client, bucket, key)
+        if size < offset:
+            offset = 0
+        consumed = 0
+        if size > offset:
+            response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={offset}-{size - 1}")
+            body = response['Body']
+            reader = LineReader(body, chunk_size, include_partial=False)
+            try:
+                yield from reader
+            finally:
+                body.close()
+                consumed = reader.offset
+                offset += consumed
+        if not consumed:
+            yield IDLE
+            _wait(stop, poll_interval)
+
+
+def first_lines(lines: Iterable[bytes], count: int) -> List[bytes]:
+    """
+    The first lines of a follow source, up to `count` non-empty ones: stops at the first
+    idle poll after a line has arrived instead of waiting for more
+    """
+    head: List[bytes] = []
+    received = 0
+    for line in lines:
+        if not line:
+            if received:
+                break
+            continue
+        head.append(line)
+        received += 1
+        if received >= count:
+            break
+    return head
+
+
+class CallbackSink:
+    """Stands in for a ParsedLogBatch in LogScanner and hands each critical entry to a callback as it is found"""
+
+    # Each entry is alerted on as soon as it is scanned, without templates or insight buffers
+    immediate = True
+
+    def __init__(self, callback: Callable[[Dict], None]):
+        self.callback = callback
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, log_entry: Dict):
+        self.count += 1
+        self.callback(log_entry)
+
+
+def format_event(log_entry: Dict) -> Dict:
+    """JSON-serializable view of a critical entry for alerting"""
+    return {
+        "raw": log_entry["raw_log"],
+        "data": log_entry["extracted_data"],
+        "severity": log_entry.get("severity"),
+        "potential_threat": log_entry.get("potential_threat"),
+        "recommended_action": log_entry.get("recommended_action"),
+    }
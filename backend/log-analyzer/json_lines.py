@@ -0,0 +1,86 @@
+import json
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+TRIAGE_LEVELS = ("error", "critical", "warning")
+
+_DECODE_ERRORS: Tuple[type, ...] = (ValueError,)
+if msgspec is not None:
+    _DECODE_ERRORS += (msgspec.DecodeError, msgspec.ValidationError)
+
+
+def _fast_loads() -> Tuple[str, Callable[[str], Any]]:
+    """Pick the fastest available JSON decoder"""
+    if orjson is not None:
+        return "orjson", orjson.loads
+    if msgspec is not None:
+        return "msgspec", msgspec.json.decode
+    return "json", json.loads
+
+
+class JSONLinesParser:
+    """
+    JSON-lines backend for the "json" log format.
+
+    Decodes with orjson or msgspec when installed, falling back to the standard
+    library for lines they reject so results match json.loads. Triage looks at the
+    raw line first and skips decoding when the triage key cannot be present; with
+    msgspec only the triage field is decoded, and the full record is decoded only
+    for flagged lines. Note that orjson decodes integers wider than 64 bits as floats.
+    """
+
+    def __init__(self, triage_field: str = "level", triage_values: Iterable[str] = TRIAGE_LEVELS):
+        self.triage_field = triage_field
+        self.triage_values = frozenset(triage_values)
+        self.decoder_name, self._fast_loads = _fast_loads()
+        self._quoted_field = json.dumps(triage_field)
+        self._triage_decoder = None
+        if msgspec is not None:
+            record = msgspec.defstruct("TriageRecord", [(triage_field, Any, None)])
+            self._triage_decoder = msgspec.json.Decoder(record)
+
+    def __reduce__(self):
+        # msgspec decoders cannot be pickled; rebuild them, e.g. in spawned worker processes
+        return JSONLinesParser, (self.triage_field, tuple(self.triage_values))
+
+    def loads(self, line: str) -> Any:
+        """Decode a line; raises ValueError if it is not valid JSON"""
+        try:
+            return self._fast_loads(line)
+        except _DECODE_ERRORS:
+            return json.loads(line)
+
+    def triage(self, line: str) -> Optional[Dict]:
+        """Return the decoded record if its triage field flags it (e.g. level error), else None"""
+        # A key can only be spelled differently in the raw text through \u escapes
+        if self._quoted_field not in line and "\\u" not in line:
+            return None
+        data = value = None
+        decoded = False
+        if self._triage_decoder is not None:
+            try:
+                value = getattr(self._triage_decoder.decode(line), self.triage_field)
+                decoded = True
+            except _DECODE_ERRORS:
+                # Not an object, or input only the standard library accepts (e.g. NaN)
+                pass
+        if not decoded:
+            try:
+                data = self.loads(line)
+            except ValueError:
+                return None
+            value = data.get(self.triage_field) if isinstance(data, dict) else None
+        if not isinstance(value, str) or value.lower() not in self.triage_values:
+            return None
+        if data is None:
+            data = self.loads(line)
+        return data if isinstance(data, dict) else None
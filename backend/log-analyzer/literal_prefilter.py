@@ -0,0 +1,162 @@
+import re
+from typing import FrozenSet, List, Tuple
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover - the parser moved into the re package in Python 3.11
+    sre_constants = None
+    sre_parse = None
+
+# A factor is a set of lowercase literals; a line can only match if it contains one of them.
+# A rule's prefilter is a tuple of factors that must all be satisfied.
+Factor = FrozenSet[str]
+
+MAX_FACTORS = 3
+
+
+def _selectivity(factor: Factor) -> int:
+    return min(len(literal) for literal in factor)
+
+
+def _factors(subpattern) -> List[Factor]:
+    c = sre_constants
+    factors: List[Factor] = []
+    run: List[str] = []
+
+    def flush():
+        if run:
+            factors.append(frozenset(["".join(run)]))
+            run.clear()
+
+    for op, av in subpattern:
+        if op is c.LITERAL:
+            run.append(chr(av).lower())
+        elif op is c.AT:
+            # Anchors and word boundaries consume nothing, the literal run continues
+            continue
+        elif op is c.IN and len(av) == 1 and av[0][0] is c.LITERAL:
+            run.append(chr(av[0][1]).lower())
+        elif op is c.SUBPATTERN:
+            flush()
+            factors.extend(_factors(av[-1]))
+        elif op is getattr(c, "ATOMIC_GROUP", None):
+            flush()
+            factors.extend(_factors(av))
+        elif op in (c.MAX_REPEAT, c.MIN_REPEAT, getattr(c, "POSSESSIVE_REPEAT", None)):
+            flush()
+            minimum, _, item = av
+            if minimum >= 1:
+                factors.extend(_factors(item))
+        elif op is c.BRANCH:
+            flush()
+            alternatives = [_factors(branch) for branch in av[1]]
+            if all(alternatives):
+                # Every alternative must contribute, so take each one's most selective factor
+                factors.append(frozenset().union(*(max(alt, key=_selectivity) for alt in alternatives)))
+        else:
+            flush()
+    flush()
+    return factors
+
+
+def required_literals(pattern: str, flags: int = 0) -> Tuple[Factor, ...]:
+    """
+    Derive the literals any match of `pattern` must contain.
+
+    Returns up to MAX_FACTORS factors, most selective first. Literals are lowercased and
+    only valid for ASCII input, so callers must treat non-ASCII lines as candidates.
+    An empty tuple means nothing could be derived and the regex must always run.
+    """
+    if sre_parse is None:
+        return ()
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except (re.error, TypeError):
+        return ()
+    factors = [factor for factor in _factors(parsed) if all(literal.isascii() for literal in factor)]
+    factors.sort(key=_selectivity, reverse=True)
+    return tuple(factors[:MAX_FACTORS])
+
+
+def may_match(lowered: str, factors: Tuple[Factor, ...]) -> bool:
+    """Return False if the lowercased ASCII line cannot match a rule with these factors"""
+    for factor in factors:
+        for literal in factor:
+            if literal in lowered:
+                break
+        else:
+            return False
+    return True
+
+
+
+_DIGITS = frozenset(range(ord("0"), ord("9") + 1))
+
+
+def _class_digits(items) -> FrozenSet[int]:
+    """ASCII digits matched by a character class, before negation"""
+    c = sre_constants
+    digits = set()
+    for op, av in items:
+        if op is c.LITERAL:
+            digits.add(av)
+        elif op is c.RANGE:
+            digits.update(range(av[0], av[1] + 1))
+        elif op is c.CATEGORY and av in (c.CATEGORY_DIGIT, c.CATEGORY_WORD, c.CATEGORY_NOT_SPACE):
+            digits.update(_DIGITS)
+        elif op is c.CATEGORY and av in (c.CATEGORY_NOT_DIGIT, c.CATEGORY_NOT_WORD, c.CATEGORY_SPACE):
+            continue
+        elif op is not c.NEGATE:
+            # Anything else is not worth analyzing: assume it matches some digits only
+            digits.add(ord("0"))
+    return frozenset(digits) & _DIGITS
+
+
+def _distinguishes_digits(subpattern) -> bool:
+    c = sre_constants
+    for op, av in subpattern:
+        if op in (c.LITERAL, c.NOT_LITERAL):
+            if ord("0") <= av <= ord("9"):
+                return True
+        elif op is c.IN:
+            if _class_digits(av) not in (frozenset(), _DIGITS):
+                return True
+        elif op in (c.GROUPREF, c.GROUPREF_IGNORE, getattr(c, "GROUPREF_LOC_IGNORE", None),
+                    getattr(c, "GROUPREF_UNI_IGNORE", None)):
+            # A backreference compares the digits of two parts of the line
+            return True
+        elif op is c.SUBPATTERN:
+            if _distinguishes_digits(av[-1]):
+                return True
+        elif op in (c.MAX_REPEAT, c.MIN_REPEAT, getattr(c, "POSSESSIVE_REPEAT", None)):
+            if _distinguishes_digits(av[2]):
+                return True
+        elif op is c.BRANCH:
+            if any(_distinguishes_digits(branch) for branch in av[1]):
+                return True
+        elif op in (c.ASSERT, c.ASSERT_NOT):
+            if _distinguishes_digits(av[1]):
+                return True
+        elif op is getattr(c, "ATOMIC_GROUP", None):
+            if _distinguishes_digits(av):
+                return True
+        elif op is c.GROUPREF_EXISTS:
+            return True
+    return False
+
+
+def distinguishes_digits(pattern: str, flags: int = 0) -> bool:
+    """
+    Return True if `pattern` may match a line and not the same line with other digit
+    values: it has a digit literal, a character class holding some digits but not all
+    (\\d, \\w, [0-9] and negated classes without digits treat every digit alike), or a
+    backreference. Patterns that cannot be analyzed are assumed to tell digits apart.
+    """
+    if sre_parse is None:
+        return True
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except (re.error, TypeError):
+        return True
+    return _distinguishes_digits(parsed)
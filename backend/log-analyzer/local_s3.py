@@ -0,0 +1,140 @@
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Dict, Iterator, Optional
+
+from botocore.exceptions import ClientError
+
+
+class LocalS3Client:
+    """
+    File-backed stand-in for the subset of the boto3 S3 client used by the log analyzer.
+
+    Objects live at <root_dir>/<bucket>/<key>. Useful for running and benchmarking the
+    analyzer against exported logs without network access.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root_dir, bucket, key)
+
+    def head_object(self, Bucket: str, Key: str) -> Dict:
+        path = self._path(Bucket, Key)
+        stat = os.stat(path)
+        return {
+            "ContentLength": stat.st_size,
+            "ETag": f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+        }
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None) -> Dict:
+        path = self._path(Bucket, Key)
+        size = os.path.getsize(path)
+        body = open(path, "rb")
+        if Range is None:
+            return {"Body": body, "ContentLength": size}
+
+        start, _, end = Range.removeprefix("bytes=").partition("-")
+        start = int(start)
+        if start >= size:
+            body.close()
+            # Like S3, a range starting at or past the end of the object is unsatisfiable
+            raise ClientError({"Error": {"Code": "InvalidRange", "Message": "The requested range is not satisfiable"},
+                               "ResponseMetadata": {"HTTPStatusCode": 416}}, "GetObject")
+        end = min(int(end), size - 1) if end else size - 1
+        body.seek(start)
+        data = body.read(max(end - start + 1, 0))
+        body.close()
+        return {"Body": _BytesBody(data), "ContentLength": len(data)}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", ContinuationToken: Optional[str] = None,
+                        MaxKeys: int = 1000) -> Dict:
+        """List keys under a prefix in lexicographic order; the continuation token is the last key returned"""
+        bucket_dir = os.path.join(self.root_dir, Bucket)
+        keys = []
+        for dirpath, _, filenames in os.walk(bucket_dir):
+            for filename in filenames:
+                key = os.path.relpath(os.path.join(dirpath, filename), bucket_dir).replace(os.sep, "/")
+                if key.startswith(Prefix) and (ContinuationToken is None or key > ContinuationToken):
+                    keys.append(key)
+        keys.sort()
+        page = keys[:MaxKeys]
+        contents = []
+        for key in page:
+            stat = os.stat(self._path(Bucket, key))
+            contents.append({"Key": key, "Size": stat.st_size, "ETag": f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'})
+        response = {"Contents": contents, "KeyCount": len(contents), "IsTruncated": len(keys) > MaxKeys}
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = page[-1]
+        return response
+
+    def _upload_dir(self, upload_id: str) -> str:
+        # Bucket names cannot start with a dot, so pending parts never show up in listings
+        return os.path.join(self.root_dir, ".uploads", upload_id)
+
+    def create_multipart_upload(self, Bucket: str, Key: str) -> Dict:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._upload_dir(upload_id))
+        return {"Bucket": Bucket, "Key": Key, "UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: bytes) -> Dict:
+        with open(os.path.join(self._upload_dir(UploadId), str(PartNumber)), "wb") as f:
+            f.write(Body)
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict) -> Dict:
+        """Concatenate the parts, in the order listed, into the object"""
+        upload_dir = self._upload_dir(UploadId)
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            for part in MultipartUpload["Parts"]:
+                with open(os.path.join(upload_dir, str(part["PartNumber"])), "rb") as f:
+                    shutil.copyfileobj(f, out)
+        shutil.rmtree(upload_dir)
+        return {"Bucket": Bucket, "Key": Key}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str) -> Dict:
+        shutil.rmtree(self._upload_dir(UploadId), ignore_errors=True)
+        return {}
+
+    def get_paginator(self, operation_name: str) -> "_ListObjectsV2Paginator":
+        if operation_name != "list_objects_v2":
+            raise ValueError(f"Unsupported paginator: {operation_name}")
+        return _ListObjectsV2Paginator(self)
+
+
+class _BytesBody:
+    """Minimal StreamingBody lookalike over an in-memory buffer"""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if amt is None:
+            amt = len(self._data) - self._pos
+        chunk = self._data[self._pos:self._pos + amt]
+        self._pos += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+
+class _ListObjectsV2Paginator:
+    """Paginator lookalike for list_objects_v2"""
+
+    def __init__(self, client: LocalS3Client):
+        self.client = client
+
+    def paginate(self, **kwargs) -> Iterator[Dict]:
+        token = None
+        while True:
+            page = self.client.list_objects_v2(**kwargs, **({"ContinuationToken": token} if token else {}))
+            yield page
+            if not page["IsTruncated"]:
+                return
+            token = page["NextContinuationToken"]
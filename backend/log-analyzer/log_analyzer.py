@@ -1,60 +1,351 @@
 import boto3
+from botocore.config import Config
 import logging
 from regex_pattern_matcher import RegexPatternMatcher
+from log_formats import FORMAT_REGISTRY, get_format
+from json_lines import JSONLinesParser
+from parsed_log_batch import ParsedLogBatch
+from security_matcher import KEYWORD_RULES, SQL_INJECTION_RULES, SecurityPatternSet
+from log_sources import DEFAULT_CHUNK_SIZE, LineReader, iter_file_lines, iter_s3_lines, local_file_codec, sample_file_lines, split_block
+from decompression import MAGIC_SIZE, codec_from_key, codec_from_magic, open_decompressed
+from range_fetch import DEFAULT_RANGE_SIZE, fetch_range, iter_aligned_ranges, object_size, sample_s3_lines
+from follow import DEFAULT_POLL_INTERVAL, CallbackSink, first_lines, follow_file_lines, follow_s3_lines
+from checkpoint import TAIL_DIGEST_SIZE, Checkpoint, merge_aggregates, tail_digest
+from prefix_scan import DEFAULT_OBJECT_WORKERS, PrefixScanResult, iter_object_keys
+from report_sinks import LoggingSink, ReportEvents
+from window_aggregation import WindowedAggregator
+from sketches import LogStatistics
+from metrics import Metrics
+from multiline import parse_record_head
+from templating import LogTemplater
+from bounded_futures import BoundedFutures
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import copy
+import hashlib
+import multiprocessing
+import threading
+import time
+from functools import partial
+from itertools import chain, islice
 import os
 import json
-import re
 
 logger = logging.getLogger(__name__)
 
+SECURITY_PATTERNS_MODEL_ID = "mistral.mistral-7b-instruct-v0:2"
+SECURITY_PATTERNS_PROMPT = """Generate a list of security patterns for the following log format: {log_format}
+        Respond ONLY with JSON format:
+        {{
+            "security_patterns": ["list","of","security","patterns"]
+        }}"""
+# Cached patterns are invalidated whenever the prompt changes
+SECURITY_PATTERNS_PROMPT_VERSION = hashlib.sha256(SECURITY_PATTERNS_PROMPT.encode()).hexdigest()[:12]
+
 class LogFormatDetector:
+    """
+    Log format detection over a sample of lines.
+
+    Each sampled line is checked with the probe of every registered format plugin (see
+    log_formats), formats are scored by the fraction of lines they match and the best
+    one wins if it matches at least MIN_CONFIDENCE of the sample. The per-format
+    ratios are returned as well, which describes mixed-format files.
+    """
+    MIN_CONFIDENCE = 0.5
+
     def __init__(self, bedrock_client):
         self.bedrock = bedrock_client
 
-    def detect_log_format(self, header_lines):
-        # Define regex patterns for common log formats
-        patterns = {
-            "apache": {
-                "regex": r'^(?P<client_ip>\S+) \S+ \S+ \[(?P<request_time>[^\]]+)\] "(?P<request_method>\S+) (?P<request_url>\S+)[^"]*" (?P<http_status_code>\d{3}) (?P<content_length>\S+)( "(?P<referer>[^"]*)" "(?P<user_agent>[^"]*)")?',
-                "fields": ["client_ip", "request_time", "request_method", "request_url", "http_status_code", "content_length", "referer", "user_agent"],
-                "security_patterns": []  # Add relevant security patterns if needed
-            },
-            "syslog": {
-                "regex": r'^(?P<timestamp>\S+ \S+ \S+) (?P<hostname>\S+) (?P<service>\S+): (?P<message>.*)$',
-                "fields": ["timestamp", "hostname", "service", "message"],
-                "security_patterns": []  # Add relevant security patterns if needed
-            },
-            "json": {
-                "regex": r'^{.*}$',
-                "fields": [],  # JSON fields will be dynamic
-                "security_patterns": []  # Add relevant security patterns if needed
-            }
+    def score_lines(self, lines):
+        """Fraction of the non-blank lines matched by each format"""
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return {format_name: 0.0 for format_name in FORMAT_REGISTRY}
+        return {
+            format_name: sum(1 for line in lines if plugin.probe(line)) / len(lines)
+            for format_name, plugin in FORMAT_REGISTRY.items()
         }
 
-        # Check each pattern against the header lines
-        for format_name, details in patterns.items():
-            if re.match(details["regex"], header_lines):
-                return {
-                    "format": format_name,
-                    "fields": details["fields"],
-                    "regex_pattern": details["regex"],
-                    "security_patterns": details["security_patterns"]
-                }
+    def detect_log_format(self, header_lines):
+        """Detect the format of sampled lines, given as a list or as one newline-joined string"""
+        if isinstance(header_lines, str):
+            header_lines = header_lines.split("\n")
+        format_ratios = self.score_lines(header_lines)
+
+        # Highest ratio wins; ties go to the format registered first
+        best_format = max(format_ratios, key=format_ratios.get)
+        confidence = format_ratios[best_format]
+        if confidence >= self.MIN_CONFIDENCE:
+            plugin = FORMAT_REGISTRY[best_format]
+            return {
+                "format": best_format,
+                "fields": list(plugin.fields),
+                "regex_pattern": plugin.regex,
+                "security_patterns": list(plugin.security_patterns),
+                "confidence": confidence,
+                "format_ratios": format_ratios
+            }
 
         # If no match found, return unknown format
         return {
             "format": "unknown",
             "fields": [],
             "regex_pattern": "",
-            "security_patterns": []
+            "security_patterns": [],
+            "format_ratios": format_ratios
+        }
+
+class LogScanner:
+    """
+    Format-match + security-pattern loop of the analysis.
+
+    Holds no AWS clients so it can be pickled and shipped to worker processes.
+    """
+    def __init__(self, format_detection, regex_matcher=None, insight_generator=None, observers=None,
+                 record_assembler=None, max_templates=None):
+        self.format_detection = format_detection
+        self.log_format = format_detection.get("format", "unknown")
+        self.regex_matcher = regex_matcher or RegexPatternMatcher()
+        # The plugin's parser is only used while the detection still carries the plugin's own regex
+        plugin = get_format(self.log_format)
+        self.is_json = plugin.json_lines if plugin is not None else self.log_format.lower() == "json"
+        if plugin is not None and format_detection["regex_pattern"] == plugin.regex:
+            self.parse = plugin.make_parser(self.regex_matcher)
+        else:
+            self.parse = partial(self.regex_matcher.match_pattern, pattern=format_detection["regex_pattern"])
+        # Groups continuation lines (stack traces, pretty-printed JSON) with the line they belong to;
+        # the fields of a record are parsed from its first line, JSON records are decoded whole
+        self.record_assembler = record_assembler
+        if record_assembler is not None and not self.is_json:
+            self.parse = partial(parse_record_head, self.parse)
+        self.json_parser = JSONLinesParser()
+        self.security_insight_generator = insight_generator or DummySecurityInsightGenerator()
+        # Generators that triage many lines per call (e.g. one LLM prompt) get matches in buffers of this size
+        self.insight_buffer_size = self.security_insight_generator.buffer_size
+        self.security_matcher = SecurityPatternSet.from_patterns(format_detection["security_patterns"])
+        self.metadata = {
+            "format": self.log_format,
+            "patterns": format_detection["security_patterns"],
+            "fields": format_detection["fields"]
+        }
+        # Stream stages (e.g. WindowedAggregator) that see the parsed fields of every line,
+        # not just the lines matching a security rule; ignored for JSON lines
+        self.observers = list(observers or [])
+        # Line counts and stage latencies of the scans run by this scanner
+        self.metrics = Metrics()
+        # When set, lines sharing a template (see templating.LogTemplater) are evaluated once per scan;
+        # rules that tell digits apart could give the lines of a template different results
+        self.max_templates = max_templates
+        if max_templates and self.security_matcher.distinguishes_digits:
+            logger.warning("Security rules tell digits apart, templates are disabled and every line is evaluated")
+            self.max_templates = None
+
+    def scan(self, lines, sink=None):
+        """
+        Scan text lines and return the critical entries as a ParsedLogBatch, or append
+        them to `sink` (e.g. report_sinks.ReportEvents or follow.CallbackSink) as they are found.
+
+        With templates enabled, only the first line of each template is evaluated and kept,
+        standing for every line of its template (see ParsedLogBatch.template_counts). A sink
+        whose `immediate` attribute is set alerts on lines one by one, so neither templates
+        nor insight buffers are used then.
+        """
+        critical_entries = ParsedLogBatch(self.metadata) if sink is None else sink
+        immediate = sink is not None and sink.immediate
+        pending = self._insight_buffer(immediate)
+        is_json = self.is_json
+        security_matcher = self.security_matcher
+        json_parser = self.json_parser
+        observers = self.observers
+        templater = LogTemplater(self.max_templates) if self.max_templates and not immediate else None
+        key = template = None
+        # Counted in locals and added to the metrics once, at the end of the scan
+        read = parsed = unparsed = matched = deduplicated = 0
+        critical_before = len(critical_entries)
+        start = time.perf_counter()
+        if self.record_assembler is not None:
+            lines = self.record_assembler.assemble(lines)
+        
+        for entry in lines:
+            read += 1
+            if not entry.strip():
+                continue
+            if templater is not None:
+                key = templater.add(entry)
+                if key is None:
+                    deduplicated += 1
+            # Only process logs with security patterns
+            if is_json:
+                if templater is not None and key is None:
+                    continue
+                # Triage on the raw line with the fast decoder; only flagged lines are fully decoded
+                extracted_data = json_parser.triage(entry)
+                if extracted_data is None:
+                    continue
+                parsed += 1
+                security_match = security_matcher.scan(entry, require_rule=False)
+            else:
+                extracted_data = None
+                if observers:
+                    extracted_data = self.parse(entry)
+                    if extracted_data is None:
+                        unparsed += 1
+                        extracted_data = {}
+                    else:
+                        parsed += 1
+                    for observer in observers:
+                        observer.observe(extracted_data)
+                # Lines sharing the template of an earlier line reuse its evaluation
+                if templater is not None and key is None:
+                    continue
+                # Security patterns, SQL injection rules and keywords are evaluated once per line,
+                # and only matching lines pay for field extraction
+                security_match = security_matcher.scan(entry)
+                if security_match is None:
+                    continue
+                if extracted_data is None:
+                    extracted_data = self.parse(entry)
+                    # Ensure that even if no named groups are matched, the entry is still processed
+                    if extracted_data is None:
+                        unparsed += 1
+                        extracted_data = {}
+                    else:
+                        parsed += 1
+            if key is not None:
+                template = templater.matched(key)
+            matched += 1
+            self._add_match(critical_entries, entry, extracted_data, security_match, pending, template)
+        self._flush_insights(critical_entries, pending)
+        if templater is not None:
+            critical_entries.templated = True
+            for template in critical_entries.templates(critical_before):
+                critical_entries.template_counts[template] = templater.count(template)
+
+        critical = len(critical_entries) - critical_before
+        self.metrics.add(lines_read=read, lines_parsed=parsed, lines_unparsed=unparsed, lines_matched=matched,
+                         lines_dropped=matched - critical, lines_critical=critical,
+                         lines_deduplicated=deduplicated)
+        self.metrics.observe("scan_seconds", time.perf_counter() - start)
+                    
+        # Return both critical entries and their raw log parts
+        return critical_entries
+
+    def scan_bytes(self, lines, sink=None):
+        """Scan raw UTF-8 lines (e.g. slices of a memory-mapped file), decoding them as they are scanned"""
+        return self.scan((line.decode("utf-8", "replace") for line in lines), sink)
+
+    def _insight_buffer(self, immediate):
+        # Entries of an immediate sink are alerted on one by one, without waiting for a full buffer
+        return [] if not immediate and self.insight_buffer_size > 1 else None
+
+    def _add_match(self, critical_entries, entry, extracted_data, security_match, pending=None, template=None):
+        """Generate the insight of a matched line (or buffer it in `pending`) and keep it if critical"""
+        log_entry = {
+            "raw_log": entry,
+            "extracted_data": extracted_data,
+            "security_match": security_match,
+            "metadata": self.metadata
         }
+        if template is not None:
+            log_entry["template"] = template
+        
+        if pending is not None:
+            pending.append(log_entry)
+            if len(pending) >= self.insight_buffer_size:
+                self._flush_insights(critical_entries, pending)
+            return
+        with self.metrics.time("insight_seconds"):
+            security_analysis = self.security_insight_generator.generate_security_insights(log_entry)
+        _keep_critical(critical_entries, log_entry, security_analysis)
+
+    def _flush_insights(self, critical_entries, pending):
+        """Triage the buffered entries in one call, keeping the critical ones in scan order"""
+        if not pending:
+            return
+        with self.metrics.time("insight_seconds"):
+            insights = self.security_insight_generator.generate_batch_insights(pending)
+        for log_entry, security_analysis in zip(pending, insights):
+            _keep_critical(critical_entries, log_entry, security_analysis)
+        pending.clear()
+
+
+def _keep_critical(critical_entries, log_entry, security_analysis):
+    if security_analysis.get("severity") in ["high", "medium"]:
+        log_entry.update(security_analysis)
+        critical_entries.append(log_entry)
+
+
+_worker_scanner = None
+
+
+def _init_scan_worker(scanner):
+    global _worker_scanner
+    _worker_scanner = scanner
+
+
+def _scan_block(block):
+    batch = _worker_scanner.scan(split_block(block))
+    # Each block carries the metrics of its own scan back to the parent process
+    batch.metrics, _worker_scanner.metrics = _worker_scanner.metrics, Metrics()
+    return batch
+
+
+def _collect_observers(scanner, critical_entries):
+    """Attach the results of the scanner's stream stages, and its metrics, to the batch"""
+    for observer in scanner.observers:
+        observer.collect(critical_entries)
+    critical_entries.metrics = scanner.metrics
+    return critical_entries
+
+
+def _merge_batches(merged, batch):
+    if merged is None:
+        return batch
+    merged.extend(batch)
+    return merged
+
+
+def _no_entries(sink):
+    """Result of a run that scanned nothing: the sink passed in, or an empty batch"""
+    return ParsedLogBatch() if sink is None else sink
 
 class LogAnalyzer:
-    def __init__(self, s3_bucket, s3_key, batch_size=100):
+    def __init__(self, s3_bucket, s3_key, batch_size=100, streaming=False, chunk_size=DEFAULT_CHUNK_SIZE,
+                 workers=1, fetch_workers=8, range_size=DEFAULT_RANGE_SIZE, s3_client=None, security_patterns=None,
+                 local_path=None, s3_prefix=None, object_workers=DEFAULT_OBJECT_WORKERS,
+                 checkpoint_store=None, pattern_cache=None, window_aggregation=False, log_statistics=False,
+                 insight_generator=None, record_assembler=None, max_templates=None):
         self.s3_bucket = s3_bucket
         self.s3_key = s3_key
-        self.s3_client = boto3.client('s3')
-        self.security_patterns = None
+        # Local log file analyzed instead of the S3 object when set
+        self.local_path = local_path
+        # Every object under this prefix is analyzed instead of s3_key when set
+        self.s3_prefix = s3_prefix
+        self.object_workers = object_workers
+        # When set, each run resumes from the offset where the previous run stopped
+        self.checkpoint_store = checkpoint_store
+        self.checkpoint = None
+        # Brute-force and scan detection over sliding windows; requires parsing every line
+        self.window_aggregation = window_aggregation
+        # Top IPs/URLs and distinct IPs with fixed-memory sketches; also requires parsing every line
+        self.log_statistics = log_statistics
+        self.streaming = streaming
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.fetch_workers = fetch_workers
+        self.range_size = range_size
+        # One client (and connection pool) shared by every concurrent object and range fetch
+        self.s3_client = s3_client or boto3.client(
+            's3', config=Config(max_pool_connections=max(10, object_workers * fetch_workers))
+        )
+        # Fixed security patterns; when None they are generated per log format by the LLM
+        self.security_patterns = security_patterns
+        # Persistent cache of the LLM-generated patterns; None prompts the LLM on every run
+        self.pattern_cache = pattern_cache
+        # Patterns of each format already obtained in this run, shared with the analyzers of for_key
+        self._format_patterns = {}
+        self._pattern_lock = threading.Lock()
+        # Stage latencies of this analyzer, merged with the scan metrics at the end of each run
+        self.metrics = Metrics()
         self.bedrock = boto3.client(
             'bedrock-runtime',
             aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
@@ -65,24 +356,33 @@ class LogAnalyzer:
         self.batch_size = batch_size
         self.log_format_detector = LogFormatDetector(self.bedrock)
         self.regex_matcher = RegexPatternMatcher()
-        self.security_insight_generator = DummySecurityInsightGenerator()
+        # Rule-based insights unless a generator is given (e.g. BedrockSecurityInsightGenerator)
+        self.security_insight_generator = insight_generator or DummySecurityInsightGenerator()
+        # Multiline record assembly (see multiline.RecordAssembler); None scans line by line
+        self.record_assembler = record_assembler
+        # Lines per scan remembered as templates (see templating.LogTemplater); None evaluates every line
+        self.max_templates = max_templates
 
     def fetch_logs(self):
-        response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.s3_key)
-        logs = response['Body'].read().decode('utf-8')
+        with self.metrics.time("fetch_seconds"):
+            response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.s3_key)
+            logs = open_decompressed(response['Body'], self.s3_key).read().decode('utf-8')
         return logs
 
     def log_parser(self, logs):
         return logs.splitlines()
+
+    def iter_log_lines(self):
+        """Yield log lines, streaming the S3 body in chunks when streaming mode is enabled"""
+        if self.streaming:
+            return iter_s3_lines(self.s3_client, self.s3_bucket, self.s3_key, self.chunk_size)
+        logs = self.fetch_logs()
+        return iter(self.log_parser(logs))
     
     def prompt_for_security_patterns(self, log_format):
-        prompt = f"""Generate a list of security patterns for the following log format: {log_format}
-        Respond ONLY with JSON format:
-        {{
-            "security_patterns": ["list","of","security","patterns"]
-        }}"""
+        prompt = SECURITY_PATTERNS_PROMPT.format(log_format=log_format)
         response = self.bedrock.converse(
-            modelId="mistral.mistral-7b-instruct-v0:2",
+            modelId=SECURITY_PATTERNS_MODEL_ID,
             messages=[{"role": "user", "content": [{"text": prompt}]}],
             inferenceConfig={"maxTokens": 512, "temperature": 0.2}
         )
@@ -93,137 +393,454 @@ class LogAnalyzer:
             logger.error("JSON decoding error: %s", e)
             return None
 
-    def analyze_logs(self, verbose=False):
-        logs = self.fetch_logs()
-        logger.debug("Fetched logs, snippet: %s", logs[:100] if verbose else "Logs fetched")
-        parsed_logs = self.log_parser(logs)
-        logger.debug("Parsed logs into %d lines", len(parsed_logs) if verbose else "Logs parsed")
-        
-        # Initial format detection and pattern generation
-        log_samples = "\n".join(parsed_logs[:5])
+    def sample_log_lines(self):
+        """
+        Lines sampled from the head, middle and tail of the source for format detection,
+        or None for compressed sources, which are detected from their first lines
+        """
+        if self.local_path is not None:
+            if local_file_codec(self.local_path) is not None:
+                return None
+            return sample_file_lines(self.local_path)
+        if codec_from_key(self.s3_key) is not None:
+            return None
+        with self.metrics.time("fetch_seconds"):
+            return sample_s3_lines(self.s3_client, self.s3_bucket, self.s3_key)
+
+    def prepare_format_detection(self, header_lines, verbose=False):
+        """Detect the log format from the first lines and fill in regex/security pattern defaults"""
+        if self.record_assembler is not None:
+            # Detected on whole records, so that continuation lines don't count as lines of another format
+            header_lines = [record.replace("\n", " ") for record in self.record_assembler.assemble(header_lines)]
+        log_samples = "\n".join(header_lines)
         logger.debug("Log samples for format detection:\n%s", log_samples if verbose else "Log samples prepared")
-        format_detection = self.log_format_detector.detect_log_format(log_samples)
+        with self.metrics.time("format_detection_seconds"):
+            format_detection = self.log_format_detector.detect_log_format(log_samples)
         logger.debug("Format detection result: %s", format_detection if verbose else "Format detected")
         if isinstance(format_detection, dict):
             log_format = format_detection.get("format", "unknown")
         else:
             logger.error("Format detection did not return a dictionary: %s", type(format_detection))
-            return []
+            return None
         
         # Provide defaults if missing
+        plugin = get_format(log_format)
         if "regex_pattern" not in format_detection or not format_detection["regex_pattern"]:
-            if log_format == "apache":
-                format_detection["regex_pattern"] = r'^(?P<client_ip>\S+) \S+ \S+ \[(?P<request_time>[^\]]+)\] "(?P<request_method>\S+) (?P<request_url>\S+)[^"]*" (?P<http_status_code>\d{3}) (?P<content_length>\S+)( "(?P<referer>[^"]*)" "(?P<user_agent>[^"]*)")?'
-            else:
-                format_detection["regex_pattern"] = ""
+            format_detection["regex_pattern"] = plugin.regex if plugin is not None else ""
+        if "fields" not in format_detection:
+            format_detection["fields"] = list(plugin.fields) if plugin is not None else []
         if "security_patterns" not in format_detection or not format_detection["security_patterns"]:
-            sec_patterns_data = self.prompt_for_security_patterns(log_format)
-            format_detection["security_patterns"] = sec_patterns_data.get("security_patterns", [])
+            if self.security_patterns is not None:
+                format_detection["security_patterns"] = list(self.security_patterns)
+            else:
+                with self.metrics.time("pattern_generation_seconds"):
+                    format_detection["security_patterns"] = self.security_patterns_for_format(log_format)
+        return format_detection
+
+    def security_patterns_for_format(self, log_format):
+        """
+        LLM-generated security patterns for a log format, obtained once per format for the
+        run and served from the pattern cache when possible
+        """
+        # Serialized so that concurrent objects of a prefix scan share a single prompt per format
+        with self._pattern_lock:
+            patterns = self._format_patterns.get(log_format)
+            if patterns is None:
+                patterns = self._format_patterns[log_format] = self._load_security_patterns(log_format)
+            return list(patterns)
+
+    def _load_security_patterns(self, log_format):
+        if self.pattern_cache is not None:
+            cached = self.pattern_cache.get(log_format, SECURITY_PATTERNS_MODEL_ID, SECURITY_PATTERNS_PROMPT_VERSION)
+            if cached is not None:
+                logger.debug("Using cached security patterns for format %s", log_format)
+                return cached
+        sec_patterns_data = self.prompt_for_security_patterns(log_format)
+        if not isinstance(sec_patterns_data, dict):
+            logger.error("No security patterns generated for format %s", log_format)
+            return []
+        patterns = sec_patterns_data.get("security_patterns", [])
+        if self.pattern_cache is not None:
+            patterns = self.pattern_cache.put(log_format, SECURITY_PATTERNS_MODEL_ID,
+                                              SECURITY_PATTERNS_PROMPT_VERSION, patterns)
+        return patterns
+
+    def analyze_logs(self, verbose=False, lines=None, sink=None):
+        """
+        Scan the log source and return its critical entries as a ParsedLogBatch, or append
+        them to `sink` (see LogScanner.scan) as they are found and return the sink
+        """
+        # Lines passed in by the caller can only be detected from their header
+        sample_source = lines is None
+        if lines is None and self.local_path is not None:
+            return self.analyze_local_file(verbose, sink)
+        if lines is None and self.checkpoint_store is not None and codec_from_key(self.s3_key) is None:
+            return self.analyze_incremental(verbose, sink)
+        # Line observers (windows, sketches) keep state across lines, which the block-parallel path doesn't share,
+        # some insight generators hold clients that cannot be sent to worker processes, and multiline
+        # records may straddle blocks
+        if (lines is None and self.workers > 1 and not (self.window_aggregation or self.log_statistics)
+                and self.record_assembler is None
+                and self.security_insight_generator.process_safe
+                and codec_from_key(self.s3_key) is None):
+            return self.analyze_logs_parallel(verbose, sink)
+        if lines is None:
+            lines = self.iter_log_lines()
+        lines = iter(lines)
+        logger.debug("Log source opened (%s)", "streaming" if self.streaming else "buffered")
         
-        regex_pattern = format_detection["regex_pattern"]
-        critical_entries = []
+        # Initial format detection and pattern generation
+        header_lines = list(islice(lines, 5))
+        sampled_lines = self.sample_log_lines() if sample_source else None
+        format_detection = self.prepare_format_detection(sampled_lines or header_lines, verbose)
+        if format_detection is None:
+            return _no_entries(sink)
         
-        for entry in parsed_logs:
-            logger.debug("Processing log entry: %s", entry if verbose else "Processing entry")
-            if not entry.strip():
-                continue
-            if log_format.lower() == "json":
-                try:
-                    extracted_data = json.loads(entry)
-                except json.JSONDecodeError as e:
-                    logger.debug("JSON parsing error: %s", e if verbose else "JSON error")
-                    continue
-                entry_str = json.dumps(extracted_data)
-            else:
-                extracted_data = self.regex_matcher.match_pattern(entry, regex_pattern)
-                entry_str = entry
-            logger.debug("Matching result for entry: %s", extracted_data if verbose else "Entry matched")
-            # Ensure that even if no named groups are matched, the entry is still processed for security patterns
-            if extracted_data is None:
-                extracted_data = {}
-                
-            # Only process logs with security patterns
-            match_found = False
-            if log_format.lower() == "json" and isinstance(extracted_data, dict):
-                if "level" in extracted_data and extracted_data["level"].lower() in ["error", "critical", "warning"]:
-                    match_found = True
-            else:
-                # Enhance security pattern matching to include SQL injection detection
-                sql_injection_patterns = [
-                    r"(?i)\b(?:or|and)\b\s+['\"]?[^'\"]+['\"]?\s*=\s*['\"]?[^'\"]+['\"]?",
-                    r"(?i)(?:union\s+select|select\s+\*|insert\s+into|update\s+set|delete\s+from)\b"
-                ]
-                match_found = any(re.search(pattern, entry_str, re.IGNORECASE) for pattern in format_detection["security_patterns"] + sql_injection_patterns)
-            if match_found:
-                log_entry = {
-                    "raw_log": entry,
-                    "extracted_data": extracted_data,
-                    "metadata": {
-                        "format": log_format,
-                        "patterns": format_detection["security_patterns"],
-                        "fields": format_detection["fields"]
-                    }
-                }
-                
-                security_analysis = self.security_insight_generator.generate_security_insights(log_entry)
-                if security_analysis.get("severity") in ["high", "medium"]:
-                    log_entry.update(security_analysis)
-                    critical_entries.append(log_entry)
-                    
+        scanner = self._new_scanner(format_detection)
         # Return both critical entries and their raw log parts
+        return _collect_observers(scanner, scanner.scan(chain(header_lines, lines), sink))
+
+    def _new_scanner(self, format_detection, on_window_event=None):
+        observers = []
+        if self.window_aggregation:
+            observers.append(WindowedAggregator(on_event=on_window_event))
+        if self.log_statistics:
+            observers.append(LogStatistics())
+        return LogScanner(format_detection, self.regex_matcher, self.security_insight_generator, observers,
+                          self.record_assembler, self.max_templates)
+
+    def _tail_digest(self, offset):
+        start = max(0, offset - TAIL_DIGEST_SIZE)
+        return tail_digest(fetch_range(self.s3_client, self.s3_bucket, self.s3_key, start, offset - 1) if offset else b"")
+
+    def analyze_incremental(self, verbose=False, sink=None):
+        """
+        Analyze only the bytes appended since the last checkpointed run.
+
+        The checkpoint is reused when the object still starts with the bytes that were
+        analyzed (same digest of the bytes before the offset); otherwise the object is
+        scanned from the start. Only complete lines are consumed, so a partially written
+        last line is picked up by the next run. The format detection of the first run is
+        reused, since the tail has no header. Compressed objects (e.g. rotated logs without
+        a compression extension) cannot be resumed at a byte offset: they are scanned whole,
+        without a checkpoint.
+        """
+        head = self.s3_client.head_object(Bucket=self.s3_bucket, Key=self.s3_key)
+        etag, size = head["ETag"], head["ContentLength"]
+        if size and codec_from_magic(fetch_range(self.s3_client, self.s3_bucket, self.s3_key, 0, MAGIC_SIZE - 1)):
+            logger.debug("Compressed object detected, scanning it without a checkpoint")
+            return self.analyze_logs(verbose, lines=iter_s3_lines(self.s3_client, self.s3_bucket, self.s3_key,
+                                                                  self.chunk_size), sink=sink)
+        checkpoint = self.checkpoint_store.get(self.s3_bucket, self.s3_key)
+        start, format_detection, aggregates = 0, None, None
+        if checkpoint is not None:
+            if checkpoint.etag == etag:
+                logger.debug("s3://%s/%s unchanged since the last run", self.s3_bucket, self.s3_key)
+                self.checkpoint = checkpoint
+                return _no_entries(sink)
+            if size >= checkpoint.offset and self._tail_digest(checkpoint.offset) == checkpoint.tail_digest:
+                if size == checkpoint.offset:
+                    # Same bytes under a new ETag (e.g. copied over itself): there is nothing to fetch,
+                    # and S3 rejects a range starting at the object size
+                    logger.debug("s3://%s/%s has no new bytes since the last run", self.s3_bucket, self.s3_key)
+                    self.checkpoint = checkpoint._replace(etag=etag)
+                    self.checkpoint_store.put(self.s3_bucket, self.s3_key, self.checkpoint)
+                    return _no_entries(sink)
+                start, format_detection, aggregates = checkpoint.offset, checkpoint.format_detection, checkpoint.aggregates
+            else:
+                logger.info("s3://%s/%s was rewritten, analyzing it from the start", self.s3_bucket, self.s3_key)
+
+        if start:
+            response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.s3_key, Range=f"bytes={start}-")
+        else:
+            response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.s3_key)
+        logger.debug("Log source opened (resuming at byte %d)", start)
+        body = response['Body']
+        try:
+            reader = LineReader(body, self.chunk_size, include_partial=False)
+            lines = reader.decoded()
+            if format_detection is None:
+                header_lines = list(islice(lines, 5))
+                format_detection = self.prepare_format_detection(self.sample_log_lines() or header_lines, verbose)
+                if format_detection is None:
+                    return _no_entries(sink)
+                lines = chain(header_lines, lines)
+            scanner = self._new_scanner(format_detection)
+            critical_entries = _collect_observers(scanner, scanner.scan(lines, sink))
+        finally:
+            body.close()
+
+        offset = start + reader.offset
+        self.checkpoint = Checkpoint(etag, offset, self._tail_digest(offset), format_detection,
+                                     merge_aggregates(aggregates, critical_entries))
+        self.checkpoint_store.put(self.s3_bucket, self.s3_key, self.checkpoint)
         return critical_entries
 
+    def analyze_local_file(self, verbose=False, sink=None):
+        """Analyze a local log file (memory-mapped, or decompressed if compressed), decoding its lines as they are scanned"""
+        lines = iter_file_lines(self.local_path, self.chunk_size)
+        logger.debug("Log source opened (local %s)", self.local_path)
+        header_lines = list(islice(lines, 5))
+        format_detection = self.prepare_format_detection(
+            self.sample_log_lines() or [line.decode("utf-8", "replace") for line in header_lines], verbose)
+        if format_detection is None:
+            return _no_entries(sink)
+        
+        scanner = self._new_scanner(format_detection)
+        return _collect_observers(scanner, scanner.scan_bytes(chain(header_lines, lines), sink))
+
+    def analyze_logs_parallel(self, verbose=False, sink=None):
+        """
+        Fetch the object with concurrent ranged GETs and scan line-aligned blocks in a process pool.
+
+        Critical entries are merged in original log order, and passed on to `sink` block
+        by block as the scans complete.
+        """
+        blocks = iter_aligned_ranges(self.s3_client, self.s3_bucket, self.s3_key, self.range_size, self.fetch_workers)
+        first_block = next(blocks, None)
+        if first_block is None:
+            return _no_entries(sink)
+        if codec_from_magic(first_block) is not None:
+            # Compressed streams cannot be split at byte ranges, scan them sequentially
+            blocks.close()
+            logger.debug("Compressed object detected, falling back to streaming")
+            return self.analyze_logs(verbose, lines=iter_s3_lines(self.s3_client, self.s3_bucket, self.s3_key,
+                                                                  self.chunk_size), sink=sink)
+        header_lines = split_block(first_block)[:5]
+        format_detection = self.prepare_format_detection(self.sample_log_lines() or header_lines, verbose)
+        if format_detection is None:
+            return _no_entries(sink)
+
+        scanner = LogScanner(format_detection, insight_generator=self.security_insight_generator,
+                             max_templates=self.max_templates)
+        critical_entries = sink
+        # Forking from an object worker of a prefix scan would copy the locks of the other object
+        # workers in whatever state they are in, so block workers are spawned there instead
+        mp_context = None
+        if threading.current_thread() is not threading.main_thread():
+            mp_context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context, initializer=_init_scan_worker,
+                                 initargs=(scanner,)) as executor:
+            scans = BoundedFutures(executor, 2 * self.workers)
+            for block in chain([first_block], blocks):
+                for future in scans.submit(_scan_block, block):
+                    critical_entries = _merge_batches(critical_entries, future.result())
+            for future in scans.drain():
+                critical_entries = _merge_batches(critical_entries, future.result())
+        return critical_entries
+
+    def follow(self, on_event, verbose=False, poll_interval=DEFAULT_POLL_INTERVAL, from_start=False, stop=None,
+               on_window_event=None):
+        """
+        Follow the local file or S3 object and pass each critical entry to `on_event` as soon as it is scanned.
+
+        New data is polled every `poll_interval` seconds, which bounds the delay between a
+        line being written and its alert. Existing content is only used for format detection
+        unless `from_start` is set; an empty source is detected on the lines that arrive within
+        a poll interval of the first one. Runs until `stop` (a threading.Event) is set. With window
+        aggregation enabled, its events are passed to `on_window_event` as they fire.
+        Returns the number of critical entries emitted.
+        """
+        if self.local_path is not None:
+            if local_file_codec(self.local_path) is not None:
+                raise ValueError("Compressed log files cannot be followed")
+            size = os.path.getsize(self.local_path)
+            lines = follow_file_lines(self.local_path, poll_interval, 0 if from_start else size, stop, self.chunk_size)
+            logger.debug("Following %s from byte %d", self.local_path, 0 if from_start else size)
+        else:
+            if codec_from_key(self.s3_key) is not None:
+                raise ValueError("Compressed objects cannot be followed")
+            size = object_size(self.s3_client, self.s3_bucket, self.s3_key)
+            lines = follow_s3_lines(self.s3_client, self.s3_bucket, self.s3_key, poll_interval,
+                                    0 if from_start else size, stop, self.chunk_size)
+            logger.debug("Following s3://%s/%s from byte %d", self.s3_bucket, self.s3_key, 0 if from_start else size)
+
+        pending = []
+        sampled_lines = self.sample_log_lines()
+        if not sampled_lines:
+            # Nothing written yet: detect the format from the lines that arrive within a poll
+            # interval of the first one, then scan them too
+            pending = first_lines(lines, 5)
+            sampled_lines = [line.decode("utf-8", "replace") for line in pending]
+        format_detection = self.prepare_format_detection(sampled_lines, verbose)
+        if format_detection is None:
+            return 0
+
+        scanner = self._new_scanner(format_detection, on_window_event)
+        sink = CallbackSink(on_event)
+        scanner.scan_bytes(chain(pending, lines), sink)
+        return sink.count
+
+    def for_key(self, s3_key):
+        """Analyzer for another object of the same bucket, sharing clients and settings"""
+        analyzer = copy.copy(self)
+        analyzer.s3_key = s3_key
+        analyzer.local_path = None
+        analyzer.s3_prefix = None
+        analyzer.checkpoint = None
+        return analyzer
+
+    def analyze_prefix(self, s3_prefix=None, verbose=False, sink=None):
+        """
+        Analyze every object under a prefix with a bounded pool of object workers.
+
+        Objects are listed page by page and their critical entries are merged in listing
+        order, or passed on to `sink` (see report_sinks.ReportEvents) object by object, tagged
+        with their key, as the objects complete. An object that fails is recorded in the result
+        instead of aborting the scan.
+        """
+        s3_prefix = self.s3_prefix if s3_prefix is None else s3_prefix
+        result = PrefixScanResult(self.s3_bucket, s3_prefix, keep_entries=sink is None)
+
+        def analyze(key):
+            """Critical entries of one object, or the exception its analysis failed with"""
+            try:
+                return key, self.for_key(key).analyze_logs(verbose)
+            except Exception as e:
+                return key, e
+
+        def collect(future):
+            key, outcome = future.result()
+            if isinstance(outcome, Exception):
+                logger.error("Analysis of s3://%s/%s failed: %s", self.s3_bucket, key, outcome)
+                result.add_error(key, outcome)
+            else:
+                result.add(key, outcome)
+                if sink is not None:
+                    # The template counts of a whole object are final
+                    sink.extend(outcome, source=key)
+                    sink.flush()
+
+        with ThreadPoolExecutor(max_workers=self.object_workers) as executor:
+            analyses = BoundedFutures(executor, 2 * self.object_workers)
+            for key in iter_object_keys(self.s3_client, self.s3_bucket, s3_prefix):
+                logger.debug("Scheduling s3://%s/%s", self.s3_bucket, key)
+                for future in analyses.submit(analyze, key):
+                    collect(future)
+            for future in analyses.drain():
+                collect(future)
+        return result
+
     def analyze_logs_with_patterns(self, log_format, security_patterns):
         logs = self.fetch_logs()
         parsed_logs = self.log_parser(logs)
-        security_relevant_logs = self.security_filter.filter_security_relevant_logs(parsed_logs, log_format, security_patterns)
+        if self.record_assembler is not None:
+            parsed_logs = self.record_assembler.assemble(parsed_logs)
+        security_matcher = SecurityPatternSet.from_patterns(security_patterns)
+        metadata = {"format": log_format, "patterns": security_patterns}
+        security_relevant_logs = []
+        for line in parsed_logs:
+            security_match = security_matcher.scan(line)
+            if security_match is not None:
+                security_relevant_logs.append({"raw_log": line, "security_match": security_match, "metadata": metadata})
         critical_information = []
         for i in range(0, len(security_relevant_logs), self.batch_size):
             batch = security_relevant_logs[i:i + self.batch_size]
-            for entry in batch:
-                security_analysis = self.security_insight_generator.generate_security_insights(entry)
+            # Each batch is triaged in one call (one prompt per batch_size lines with an LLM generator)
+            for entry, security_analysis in zip(batch, self.security_insight_generator.generate_batch_insights(batch)):
                 if security_analysis["severity"] in ["high", "medium"]:
                     entry.update(security_analysis)
                     logger.critical(f"Critical Information: {entry}")
                     critical_information.append(entry)
         return critical_information
 
-    def run_analysis(self, log_type, verbose=False):
-        """Main analysis pipeline with integrated format detection"""
-        critical_information = self.analyze_logs(verbose)
-        
-        recommendations = self.security_insight_generator.generate_summary_recommendations(critical_information)
-        summary = {
-            "critical_events": len(critical_information),
-            "events": [
-                {
-                    "raw": entry["raw_log"],
-                    "data": entry["extracted_data"],
-                    "metadata": entry["metadata"]
-                } for entry in critical_information
-            ],
-            "summary": recommendations.get("summary", "No summary available"),
-            "critical_issues": recommendations.get("critical_issues", []),
-            "actions": recommendations.get("recommendations", [])
-        }
-        logger.info("Security Analysis Summary:\n%s", json.dumps(summary, indent=2))
+    def run_analysis(self, log_type, verbose=False, sinks=None):
+        """
+        Main analysis pipeline with integrated format detection.
+
+        The critical events are written to each report sink (see report_sinks) as the scan
+        keeps them, then the summary; without sinks the events are logged (LoggingSink). The
+        summary is logged and returned. It includes a snapshot of the pipeline metrics, which
+        accumulate in `self.metrics` across runs (see Metrics.to_prometheus).
+        """
+        sinks = list(sinks) if sinks else [LoggingSink()]
+        critical_information = ReportEvents(sinks)
+        try:
+            if self.s3_prefix is not None:
+                prefix_result = self.analyze_prefix(verbose=verbose, sink=critical_information)
+            else:
+                prefix_result = None
+                self.analyze_logs(verbose, sink=critical_information)
+            report_start = time.perf_counter()
+            critical_information.flush()
+
+            recommendations = self.security_insight_generator.generate_summary_recommendations(critical_information)
+            summary = {
+                "critical_events": critical_information.line_count(),
+                "summary": recommendations.get("summary", "No summary available"),
+                "critical_issues": recommendations.get("critical_issues", []),
+                "actions": recommendations.get("recommendations", [])
+            }
+            if critical_information.templated:
+                # One event per template; critical_events counts every line of the templates
+                summary["critical_templates"] = len(critical_information)
+            if self.window_aggregation:
+                summary["window_events"] = critical_information.window_events
+            if self.log_statistics and critical_information.statistics is not None:
+                summary["statistics"] = critical_information.statistics.summary()
+            if prefix_result is not None:
+                summary["objects"] = prefix_result.stats()
+            elif self.checkpoint is not None:
+                summary["checkpoint"] = {"offset": self.checkpoint.offset, **self.checkpoint.aggregates}
+            if critical_information.metrics is not None:
+                self.metrics.merge(critical_information.metrics)
+            summary["metrics"] = self.metrics.snapshot()
+            for sink in sinks:
+                sink.write_summary(summary)
+        except BaseException:
+            for sink in sinks:
+                sink.abort()
+            raise
+        for sink in sinks:
+            sink.close()
+        self.metrics.observe("report_seconds", time.perf_counter() - report_start)
+        logger.info("Security Analysis Summary: %s", json.dumps(summary))
+        return summary
+
+_SQL_INJECTION_INSIGHT = {
+    "severity": "high",
+    "potential_threat": "Possible SQL injection detected",
+    "recommended_action": "Review query parameters and implement proper input sanitization"
+}
+
+# Insight per rule id, in priority order: the first rule present in a match decides the insight
+SECURITY_INSIGHTS = [
+    ("error_keyword", {
+        "severity": "high",
+        "potential_threat": "Detected error in log",
+        "recommended_action": "Investigate immediately"
+    }),
+    ("sql_injection_boolean", _SQL_INJECTION_INSIGHT),
+    ("sql_injection_keyword", _SQL_INJECTION_INSIGHT),
+]
+
+# Used for entries that were not produced by LogScanner and carry no security match
+_INSIGHT_MATCHER = SecurityPatternSet(SQL_INJECTION_RULES, keywords=KEYWORD_RULES)
 
 class DummySecurityInsightGenerator:
+    """
+    Rule-based insights from the security match of each entry.
+
+    Other insight generators (e.g. bedrock_insights.BedrockSecurityInsightGenerator)
+    provide the same methods and attributes.
+    """
+
+    # Entries triaged per generate_batch_insights call; LogScanner buffers this many matches
+    buffer_size = 1
+    # Holds no clients, so scanners using it can be sent to worker processes
+    process_safe = True
+
     def generate_security_insights(self, log_entry):
-        raw_log_lower = log_entry["raw_log"].lower()
-        if "error" in raw_log_lower:
-            return {
-                "severity": "high",
-                "potential_threat": "Detected error in log",
-                "recommended_action": "Investigate immediately"
-            }
-        elif re.search(r"(?i)\b(?:or|and)\b\s+['\"]?[^'\"]+['\"]?\s*=\s*['\"]?[^'\"]+['\"]?|(?:union\s+select|select\s+\*|insert\s+into|update\s+set|delete\s+from)\b", raw_log_lower):
-            return {
-                "severity": "high",
-                "potential_threat": "Possible SQL injection detected",
-                "recommended_action": "Review query parameters and implement proper input sanitization"
-            }
+        security_match = log_entry.get("security_match")
+        if security_match is None:
+            security_match = _INSIGHT_MATCHER.scan(log_entry["raw_log"], require_rule=False)
+        for rule_id, insight in SECURITY_INSIGHTS:
+            if rule_id in security_match.rule_ids:
+                return dict(insight)
         return {"severity": "low"}
+
+    def generate_batch_insights(self, log_entries):
+        return [self.generate_security_insights(log_entry) for log_entry in log_entries]
     
     def generate_summary_recommendations(self, critical_entries):
         if not critical_entries:
@@ -0,0 +1,160 @@
+import re
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from json_lines import JSONLinesParser
+from regex_pattern_matcher import RegexPatternMatcher
+
+Parser = Callable[[str], Optional[Dict]]
+
+# Common/Combined Log Format regex used for the "apache" log format
+CLF_REGEX = r'^(?P<client_ip>\S+) \S+ \S+ \[(?P<request_time>[^\]]+)\] "(?P<request_method>\S+) (?P<request_url>\S+)[^"]*" (?P<http_status_code>\d{3}) (?P<content_length>\S+)( "(?P<referer>[^"]*)" "(?P<user_agent>[^"]*)")?'
+
+
+class LogFormat:
+    """
+    Format plugin: a detection probe and a parser for one log format.
+
+    `regex` is the pattern with named groups used both as the default probe and as the
+    default parser. Plugins override `probe` and `make_parser` to ship a faster path;
+    parsers must be picklable (module-level functions or partials) so LogScanner can
+    be sent to worker processes.
+    """
+    name = ""
+    regex = ""
+    fields: List[str] = []
+    security_patterns: List[str] = []  # Add relevant security patterns if needed
+    # JSON-lines formats are triaged on the decoded record instead of the security rules
+    json_lines = False
+
+    def __init__(self):
+        self.compiled = re.compile(self.regex)
+
+    def probe(self, line: str) -> bool:
+        """Whether a single line looks like this format"""
+        return self.compiled.match(line) is not None
+
+    def make_parser(self, regex_matcher: Optional[RegexPatternMatcher] = None) -> Parser:
+        """Return a function that extracts the fields of a line, or None if it does not match"""
+        return partial((regex_matcher or RegexPatternMatcher()).match_pattern, pattern=self.regex)
+
+
+FORMAT_REGISTRY: Dict[str, LogFormat] = {}
+
+
+def register_format(plugin_class):
+    """Class decorator adding a format plugin to the registry; registration order is detection priority"""
+    plugin = plugin_class()
+    FORMAT_REGISTRY[plugin.name] = plugin
+    return plugin_class
+
+
+def get_format(name: str) -> Optional[LogFormat]:
+    return FORMAT_REGISTRY.get(name)
+
+
+_JSON_PARSER = JSONLinesParser()
+
+
+def _parse_json_object(line: str) -> Optional[Dict]:
+    try:
+        record = _JSON_PARSER.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def parse_cloudtrail(line: str) -> Optional[Dict]:
+    """Flatten the commonly queried fields of a CloudTrail event"""
+    record = _parse_json_object(line)
+    if record is None:
+        return None
+    identity = record.get("userIdentity")
+    return {
+        "event_time": record.get("eventTime"),
+        "event_source": record.get("eventSource"),
+        "event_name": record.get("eventName"),
+        "aws_region": record.get("awsRegion"),
+        "source_ip": record.get("sourceIPAddress"),
+        "user_agent": record.get("userAgent"),
+        "user_arn": identity.get("arn") if isinstance(identity, dict) else None,
+        "error_code": record.get("errorCode"),
+    }
+
+
+VPC_FLOW_FIELDS = ["version", "account_id", "interface_id", "srcaddr", "dstaddr", "srcport", "dstport",
+                   "protocol", "packets", "bytes", "start", "end", "action", "log_status"]
+
+
+def parse_vpc_flow(line: str) -> Optional[Dict]:
+    """Parse a default-format (version 2) VPC flow log record by splitting on spaces"""
+    values = line.split(" ")
+    if len(values) != len(VPC_FLOW_FIELDS) or values[0] != "2":
+        return None
+    return dict(zip(VPC_FLOW_FIELDS, values))
+
+
+@register_format
+class CLFFormat(LogFormat):
+    """Common/Combined Log Format, as written by Apache httpd and nginx access logs"""
+    name = "apache"
+    regex = CLF_REGEX
+    fields = ["client_ip", "request_time", "request_method", "request_url", "http_status_code", "content_length", "referer", "user_agent"]
+
+
+@register_format
+class NginxErrorFormat(LogFormat):
+    name = "nginx_error"
+    regex = r'^(?P<timestamp>\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}) \[(?P<level>\w+)\] (?P<pid>\d+)#(?P<tid>\d+): (?:\*(?P<connection>\d+) )?(?P<message>.*?)(?:, client: (?P<client_ip>[^,]+)(?:, server: (?P<server>[^,]*))?(?:, request: "(?P<request>[^"]*)")?.*)?$'
+    fields = ["timestamp", "level", "pid", "tid", "connection", "message", "client_ip", "server", "request"]
+
+
+@register_format
+class SyslogRFC5424Format(LogFormat):
+    name = "syslog_rfc5424"
+    regex = r'^<(?P<priority>\d{1,3})>(?P<version>\d{1,2}) (?P<timestamp>\S+) (?P<hostname>\S+) (?P<app_name>\S+) (?P<procid>\S+) (?P<msgid>\S+) (?P<structured_data>-|(?:\[(?:[^\]\\]|\\.)*\])+)(?: (?P<message>.*))?$'
+    fields = ["priority", "version", "timestamp", "hostname", "app_name", "procid", "msgid", "structured_data", "message"]
+
+
+@register_format
+class SyslogFormat(LogFormat):
+    """BSD syslog (RFC 3164), with or without the <PRI> prefix, also accepting ISO 8601 timestamps"""
+    name = "syslog"
+    regex = r'^(?:<(?P<priority>\d{1,3})>)?(?P<timestamp>[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}|\d{4}-\d{2}-\d{2}T\S+) (?P<hostname>\S+) (?P<service>[^\s:\[]+)(?:\[(?P<pid>\d+)\])?: (?P<message>.*)$'
+    fields = ["priority", "timestamp", "hostname", "service", "pid", "message"]
+
+
+@register_format
+class VPCFlowFormat(LogFormat):
+    """VPC flow logs in the default (version 2) format"""
+    name = "vpc_flow"
+    regex = r'^(?P<version>2) (?P<account_id>\S+) (?P<interface_id>\S+) (?P<srcaddr>\S+) (?P<dstaddr>\S+) (?P<srcport>\S+) (?P<dstport>\S+) (?P<protocol>\S+) (?P<packets>\S+) (?P<bytes>\S+) (?P<start>\S+) (?P<end>\S+) (?P<action>ACCEPT|REJECT|-) (?P<log_status>OK|NODATA|SKIPDATA)$'
+    fields = VPC_FLOW_FIELDS
+
+    def make_parser(self, regex_matcher=None):
+        return parse_vpc_flow
+
+
+@register_format
+class CloudTrailFormat(LogFormat):
+    """CloudTrail events, one JSON object per line (e.g. exported from CloudWatch Logs)"""
+    name = "cloudtrail"
+    regex = r'^\{.*"eventSource".*\}$'
+    fields = ["event_time", "event_source", "event_name", "aws_region", "source_ip", "user_agent", "user_arn", "error_code"]
+
+    def probe(self, line):
+        return line.startswith("{") and '"eventSource"' in line and '"eventName"' in line
+
+    def make_parser(self, regex_matcher=None):
+        return parse_cloudtrail
+
+
+@register_format
+class JSONLinesFormat(LogFormat):
+    name = "json"
+    regex = r'^{.*}$'
+    fields = []  # JSON fields will be dynamic
+    json_lines = True
+
+    def make_parser(self, regex_matcher=None):
+        return _parse_json_object
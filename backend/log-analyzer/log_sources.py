@@ -0,0 +1,166 @@
+import mmap
+import os
+from typing import BinaryIO, Callable, Iterator, List, Optional
+
+from decompression import MAGIC_SIZE, codec_from_key, codec_from_magic, decompressing_stream, open_decompressed
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# Format detection samples: one window at the head, middle and tail of the source
+DEFAULT_SAMPLE_WINDOW = 64 * 1024
+DEFAULT_SAMPLE_LINES = 60
+
+
+class LineReader:
+    """
+    Incrementally split a binary stream into lines.
+
+    Lines are split on b"\\n" at the byte level, so multi-byte UTF-8 sequences
+    are never cut in half at chunk boundaries. Only one chunk plus the pending
+    partial line is held in memory at any time.
+    """
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE, include_partial: bool = True):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.include_partial = include_partial
+        # Number of bytes covered by the lines yielded so far (newlines included)
+        self.offset = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        pending = b""
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                break
+            if pending:
+                chunk = pending + chunk
+            lines = chunk.split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                self.offset += len(line) + 1
+                yield line[:-1] if line.endswith(b"\r") else line
+        if pending and self.include_partial:
+            self.offset += len(pending)
+            yield pending[:-1] if pending.endswith(b"\r") else pending
+
+    def decoded(self, encoding: str = "utf-8", errors: str = "replace") -> Iterator[str]:
+        """Yield lines as text; undecodable bytes are handled per line according to `errors`"""
+        for line in self:
+            yield line.decode(encoding, errors)
+
+
+def iter_s3_lines(s3_client, bucket: str, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Stream an S3 object line by line without reading the whole body.
+
+    gzip/zstd/bz2 objects (detected from the key extension or magic bytes) are
+    decompressed incrementally as the body is read.
+    """
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    body = response['Body']
+    try:
+        yield from LineReader(open_decompressed(body, key), chunk_size).decoded()
+    finally:
+        body.close()
+
+
+def split_block(block: bytes, encoding: str = "utf-8", errors: str = "replace") -> List[str]:
+    """Split a block that ends on a line boundary into decoded lines"""
+    lines = block.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    return [(line[:-1] if line.endswith(b"\r") else line).decode(encoding, errors) for line in lines]
+
+
+def iter_mmap_lines(path: str) -> Iterator[bytes]:
+    """
+    Iterate the lines of a local file through a read-only memory map.
+
+    Each line is copied out of the mapping as bytes (without the newline), so the file is
+    never read or decoded as a whole and pages are loaded on demand. Decoding memoryview
+    slices instead avoids the copy but is slower on CPython.
+    """
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return
+    with mapped:
+        size = len(mapped)
+        start = 0
+        while start < size:
+            end = mapped.find(b"\n", start)
+            if end == -1:
+                end = size
+            line = mapped[start:end]
+            yield line[:-1] if line.endswith(b"\r") else line
+            start = end + 1
+
+
+def local_file_codec(path: str) -> Optional[str]:
+    """Compression codec of a local file, from its extension or magic bytes"""
+    codec = codec_from_key(path)
+    if codec is None:
+        with open(path, "rb") as f:
+            codec = codec_from_magic(f.read(MAGIC_SIZE))
+    return codec
+
+
+def iter_file_lines(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Iterate the bytes lines of a local file: memory-mapped if plain, streamed through the decompressor otherwise"""
+    codec = local_file_codec(path)
+    if codec is None:
+        yield from iter_mmap_lines(path)
+        return
+    with open(path, "rb") as f:
+        yield from LineReader(decompressing_stream(f, codec), chunk_size)
+
+
+def sample_lines(read_range: Callable[[int, int], bytes], size: int, window_size: int = DEFAULT_SAMPLE_WINDOW,
+                 max_lines: int = DEFAULT_SAMPLE_LINES) -> Optional[List[str]]:
+    """
+    Sample complete lines from the head, middle and tail of a source of `size` bytes.
+
+    `read_range(start, end)` returns the bytes start..end (inclusive). Lines cut by a
+    window boundary are dropped, and at most max_lines // 3 lines are kept per window.
+    Small sources are read in a single window. Returns None for compressed data, which
+    cannot be sampled at arbitrary offsets.
+    """
+    if size <= 0:
+        return []
+    if size <= 3 * window_size:
+        windows = [(0, size - 1)]
+        per_window = max_lines
+    else:
+        middle = size // 2 - window_size // 2
+        windows = [(0, window_size - 1), (middle, middle + window_size - 1), (size - window_size, size - 1)]
+        per_window = max(1, max_lines // 3)
+
+    sampled = []
+    for start, end in windows:
+        data = read_range(start, end)
+        if start == 0 and codec_from_magic(data) is not None:
+            return None
+        lines = data.split(b"\n")
+        if start > 0:
+            # Starts mid-line unless the previous byte happens to be a newline; skip it either way
+            lines = lines[1:]
+        if end < size - 1:
+            lines = lines[:-1]
+        elif lines and not lines[-1]:
+            lines.pop()
+        sampled.extend((line[:-1] if line.endswith(b"\r") else line).decode("utf-8", "replace")
+                       for line in lines[:per_window])
+    return sampled
+
+
+def sample_file_lines(path: str, window_size: int = DEFAULT_SAMPLE_WINDOW,
+                      max_lines: int = DEFAULT_SAMPLE_LINES) -> Optional[List[str]]:
+    """Sample lines from the head, middle and tail of an uncompressed local file"""
+    with open(path, "rb") as f:
+        def read_range(start, end):
+            f.seek(start)
+            return f.read(end - start + 1)
+
+        return sample_lines(read_range, os.fstat(f.fileno()).st_size, window_size, max_lines)
@@ -0,0 +1,143 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets, from one insight call to a whole object scan
+DEFAULT_LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+METRICS_PREFIX = "sherlock"
+
+COUNTERS = {
+    "lines_read": "Lines read by the scanner including blank lines, or records with multiline assembly",
+    "lines_parsed": "Lines whose fields were extracted with the log format",
+    "lines_unparsed": "Lines that did not match the log format when parsed",
+    "lines_matched": "Lines flagged by the security rules (or the JSON triage field)",
+    "lines_dropped": "Flagged lines rated below medium severity",
+    "lines_critical": "Flagged lines kept as critical events",
+    "lines_deduplicated": "Lines sharing the template of an earlier line, which were not evaluated again",
+}
+
+HISTOGRAMS = {
+    "fetch_seconds": "Time to fetch a log object or its format detection sample",
+    "format_detection_seconds": "Time to detect the log format",
+    "pattern_generation_seconds": "Time to obtain the security patterns of a format",
+    "scan_seconds": "Time of one scan call (a whole object, or one block with --workers)",
+    "insight_seconds": "Time of one insight generator call (one entry, or one buffer of entries)",
+    "report_seconds": "Time to write the report to the sinks",
+}
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, counting each observation in the first bucket that holds it"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket, plus the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram"):
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative(self) -> Iterator[Tuple[str, int]]:
+        """(upper bound, observations <= bound) pairs, as Prometheus reports buckets"""
+        total = 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            yield bound, total
+
+    def snapshot(self) -> Dict:
+        return {"count": self.count, "sum": self.sum, "buckets": dict(self.cumulative())}
+
+
+class Metrics:
+    """
+    Counters and latency histograms of the log pipeline.
+
+    Stages count their lines in local variables and add them once per scan, so the
+    per-line cost is an integer increment. Safe to share between threads, and
+    picklable so that scanners can carry theirs to worker processes and back.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"counters": self.counters, "histograms": self.histograms}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.counters = state["counters"]
+        self.histograms = state["histograms"]
+
+    def add(self, **counts: int):
+        with self._lock:
+            for name, value in counts.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name: str):
+        """Observe the duration of the block in histogram `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def merge(self, other: "Metrics"):
+        self.add(**other.counters)
+        with self._lock:
+            for name, histogram in other.histograms.items():
+                if name in self.histograms:
+                    self.histograms[name].merge(histogram)
+                else:
+                    merged = self.histograms[name] = Histogram(histogram.buckets)
+                    merged.merge(histogram)
+
+    def snapshot(self) -> Dict:
+        """JSON-serializable view of every counter and histogram"""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {name: histogram.snapshot() for name, histogram in self.histograms.items()},
+            }
+
+    def to_prometheus(self, prefix: str = METRICS_PREFIX) -> str:
+        """Prometheus text exposition format, e.g. for the node exporter's textfile collector"""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# HELP {metric} {COUNTERS.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+            for name, histogram in sorted(self.histograms.items()):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# HELP {metric} {HISTOGRAMS.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
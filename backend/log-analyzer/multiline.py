@@ -0,0 +1,81 @@
+import re
+from typing import Iterable, Iterator, List, Optional
+
+DEFAULT_MAX_RECORD_LINES = 500
+MULTILINE_RULES = ("indent", "timestamp")
+
+# Lines continuing the previous record: indented lines (stack frames, pretty-printed JSON),
+# closing brackets, and the headers and trailers of Java and Python stack traces
+CONTINUATION_PATTERN = (
+    r"^(?:[ \t]|[}\]]|Caused by:|Suppressed:|\.\.\. \d+ more"
+    r"|Traceback \(most recent call last\)|During handling of the above exception|The above exception was"
+    r"|[A-Za-z_][\w.]*(?:Error|Exception|Warning)\b)"
+)
+
+# Lines starting a record: a timestamp (ISO 8601, syslog, CLF, nginx error log), optionally
+# after a syslog <PRI> or the client/ident/user fields of CLF
+TIMESTAMP_START_PATTERN = (
+    r"^(?:<\d{1,3}>\d? ?)?(?:\S+ \S+ \S+ )?\[?"
+    r"(?:\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}|[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}"
+    r"|\d{2}/[A-Z][a-z]{2}/\d{4}:\d{2}|\d{4}/\d{2}/\d{2} \d{2}:\d{2})"
+)
+
+
+class RecordAssembler:
+    """
+    Groups physical lines into log records before they are matched, so that a stack
+    trace or a pretty-printed JSON object is evaluated once, with the line it belongs to.
+
+    A line continues the current record if it matches `continuation_pattern`, or if
+    `start_pattern` is set and it does not match it. A blank line ends the current
+    record, and records are capped at `max_lines` lines. Records are yielded joined
+    with newlines once the next record starts or a blank line arrives: the follow
+    sources yield one (follow.IDLE) whenever a poll finds no new data, so a followed
+    record is flushed after one idle poll interval instead of waiting for the next line.
+    """
+
+    def __init__(self, start_pattern: Optional[str] = None, continuation_pattern: Optional[str] = CONTINUATION_PATTERN,
+                 max_lines: int = DEFAULT_MAX_RECORD_LINES):
+        if start_pattern is None and continuation_pattern is None:
+            raise ValueError("A start or continuation pattern is required")
+        self.start_pattern = start_pattern
+        self.continuation_pattern = continuation_pattern
+        self.max_lines = max_lines
+        self._start = re.compile(start_pattern) if start_pattern is not None else None
+        self._continuation = re.compile(continuation_pattern) if continuation_pattern is not None else None
+
+    @classmethod
+    def from_rule(cls, rule: str, max_lines: int = DEFAULT_MAX_RECORD_LINES) -> "RecordAssembler":
+        """Assembler for a named rule: "indent" (continuation lines) or "timestamp" (records start with one)"""
+        if rule == "indent":
+            return cls(max_lines=max_lines)
+        if rule == "timestamp":
+            return cls(TIMESTAMP_START_PATTERN, continuation_pattern=None, max_lines=max_lines)
+        raise ValueError(f"Unknown multiline rule: {rule}")
+
+    def is_continuation(self, line: str) -> bool:
+        if self._continuation is not None and self._continuation.match(line):
+            return True
+        return self._start is not None and not self._start.match(line)
+
+    def assemble(self, lines: Iterable[str]) -> Iterator[str]:
+        record: List[str] = []
+        for line in lines:
+            if not line.strip():
+                if record:
+                    yield "\n".join(record)
+                    record = []
+                continue
+            if record and len(record) < self.max_lines and self.is_continuation(line):
+                record.append(line)
+                continue
+            if record:
+                yield "\n".join(record)
+            record = [line]
+        if record:
+            yield "\n".join(record)
+
+
+def parse_record_head(parse, record: str):
+    """Parse the first line of a record, which carries the log format's fields"""
+    return parse(record.partition("\n")[0])
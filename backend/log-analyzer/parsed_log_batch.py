@@ -0,0 +1,236 @@
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Code 0 marks a field that is absent from an entry (as opposed to present with value None)
+_ABSENT = 0
+
+ENTRY_FIELDS = ("security_match", "severity", "model_severity", "potential_threat", "recommended_action", "template")
+
+
+def entry_event(log_entry: Dict, count: int = 1) -> Dict:
+    """Serialize an entry the way run_analysis reports it; an entry standing for a template reports its line count"""
+    event = {
+        "raw": log_entry["raw_log"],
+        "data": log_entry["extracted_data"],
+        "metadata": log_entry["metadata"]
+    }
+    template = log_entry.get("template")
+    if template is not None:
+        event["template"] = template
+        event["count"] = count
+    return event
+
+
+class _Column:
+    """
+    Dictionary-encoded column: each distinct value is stored once and rows hold a
+    4-byte code into the value table. Values are looked up by type and value, so
+    equal values of different types (True, 1, 1.0) keep their own entries. Falls
+    back to a plain list if an unhashable value (e.g. a nested JSON object) shows up.
+    """
+
+    def __init__(self, length: int = 0):
+        self.values: List[Any] = [None]
+        self.index: Dict[Tuple[type, Any], int] = {}
+        self.codes: Optional[array] = array('I', bytes(4 * length))
+        self.plain: Optional[List[Any]] = None
+
+    def __len__(self):
+        return len(self.plain) if self.plain is not None else len(self.codes)
+
+    def _to_plain(self):
+        self.plain = [self.values[code] if code != _ABSENT else _Absent for code in self.codes]
+        self.codes = None
+        self.index = {}
+
+    def append(self, value: Any):
+        if self.plain is not None:
+            self.plain.append(value)
+            return
+        key = (type(value), value)
+        try:
+            code = self.index.get(key)
+        except TypeError:
+            self._to_plain()
+            self.plain.append(value)
+            return
+        if code is None:
+            code = self.index[key] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def append_absent(self):
+        if self.plain is not None:
+            self.plain.append(_Absent)
+        else:
+            self.codes.append(_ABSENT)
+
+    def get(self, row: int) -> Any:
+        if self.plain is not None:
+            return self.plain[row]
+        code = self.codes[row]
+        return _Absent if code == _ABSENT else self.values[code]
+
+
+class _AbsentType:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<absent>"
+
+    def __reduce__(self):
+        return "_Absent"
+
+
+_Absent = _AbsentType()
+
+
+class ParsedLogBatch:
+    """
+    Columnar store for the entries produced by a log analysis.
+
+    Extracted fields and entry annotations are kept in dictionary-encoded columns and
+    the metadata (format, patterns, fields) is stored once for the whole batch instead
+    of once per entry. Iterating yields entries in the same dict shape the analyzer
+    used to return, so existing consumers keep working.
+    """
+
+    def __init__(self, metadata: Optional[Dict] = None):
+        self.metadata = metadata if metadata is not None else {}
+        self.raw_logs: List[str] = []
+        self.columns: Dict[str, _Column] = {}
+        self.entry_columns: Dict[str, _Column] = {name: _Column() for name in ENTRY_FIELDS}
+        # Events of stream stages that span several lines (e.g. brute-force windows)
+        self.window_events: List[Dict] = []
+        # Fixed-memory statistics of every line scanned (sketches.LogStatistics), when enabled
+        self.statistics = None
+        # Line counts and stage latencies of the scan that produced the batch (metrics.Metrics)
+        self.metrics = None
+        # Lines of each critical entry's template, when the scan used templates (templating.LogTemplater);
+        # each template has a single entry, standing for all of its lines
+        self.template_counts: Dict[str, int] = {}
+        # Whether the scan used templates; scanners don't when the security rules tell digits apart
+        self.templated = False
+
+    def __len__(self):
+        return len(self.raw_logs)
+
+    def _column(self, columns: Dict[str, _Column], name: str) -> _Column:
+        column = columns.get(name)
+        if column is None:
+            column = columns[name] = _Column(len(self.raw_logs))
+        return column
+
+    def append(self, log_entry: Dict):
+        """Add an entry shaped like the analyzer's log_entry dicts"""
+        extracted_data = log_entry.get("extracted_data") or {}
+        for name, value in extracted_data.items():
+            self._column(self.columns, name).append(value)
+        for name, column in self.columns.items():
+            if name not in extracted_data:
+                column.append_absent()
+        for name, column in self.entry_columns.items():
+            if name in log_entry:
+                column.append(log_entry[name])
+            else:
+                column.append_absent()
+        self.raw_logs.append(log_entry["raw_log"])
+
+    def extend(self, other: "ParsedLogBatch"):
+        """
+        Append all entries of another batch, e.g. one scanned by a worker process. An entry
+        whose template already has one here is only added to that template's line count
+        """
+        for entry in other:
+            template = entry.get("template")
+            if template is not None:
+                count = other.template_counts.get(template, 1)
+                if template in self.template_counts:
+                    self.template_counts[template] += count
+                    continue
+                self.template_counts[template] = count
+            self.append(entry)
+        self.templated = self.templated or other.templated
+        self.window_events.extend(other.window_events)
+        if other.statistics is not None:
+            if self.statistics is None:
+                self.statistics = other.statistics
+            else:
+                self.statistics.merge(other.statistics)
+        if other.metrics is not None:
+            if self.metrics is None:
+                self.metrics = other.metrics
+            else:
+                self.metrics.merge(other.metrics)
+
+    def entry(self, row: int) -> Dict:
+        extracted_data = {}
+        for name, column in self.columns.items():
+            value = column.get(row)
+            if value is not _Absent:
+                extracted_data[name] = value
+        log_entry = {
+            "raw_log": self.raw_logs[row],
+            "extracted_data": extracted_data,
+            "metadata": self.metadata,
+        }
+        for name, column in self.entry_columns.items():
+            value = column.get(row)
+            if value is not _Absent:
+                log_entry[name] = value
+        return log_entry
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(len(self.raw_logs)):
+            yield self.entry(row)
+
+    def __getitem__(self, row: int) -> Dict:
+        return self.entry(row)
+
+    def templates(self, start: int = 0) -> Iterator[str]:
+        """Templates of the entries from row `start` on that stand for a template"""
+        column = self.entry_columns["template"]
+        for row in range(start, len(self.raw_logs)):
+            template = column.get(row)
+            if template is not _Absent:
+                yield template
+
+    def line_counts(self) -> Iterator[int]:
+        """Lines each entry stands for: one, or every line of its template"""
+        column = self.entry_columns["template"]
+        for row in range(len(self.raw_logs)):
+            template = column.get(row)
+            yield 1 if template is _Absent else self.template_counts.get(template, 1)
+
+    def line_count(self) -> int:
+        """Critical lines, counting every line of the templates"""
+        return sum(self.line_counts()) if self.template_counts else len(self.raw_logs)
+
+    def lines_by_severity(self) -> Dict[str, int]:
+        """Critical lines per severity, counting every line of the templates"""
+        by_severity: Dict[str, int] = {}
+        column = self.entry_columns["severity"]
+        for severity, lines in zip(map(column.get, range(len(self.raw_logs))), self.line_counts()):
+            if isinstance(severity, str):
+                by_severity[severity] = by_severity.get(severity, 0) + lines
+        return by_severity
+
+    def iter_events(self) -> Iterator[Dict]:
+        """Serialize entries the way run_analysis reports them, one at a time"""
+        for entry, count in zip(self, self.line_counts()):
+            yield entry_event(entry, count)
+
+    def to_events(self) -> List[Dict]:
+        return list(self.iter_events())
+
+    def to_columns(self) -> Dict[str, Any]:
+        """Columnar serialization: shared metadata plus one list per field"""
+        def values(column):
+            return [None if value is _Absent else value for value in map(column.get, range(len(self.raw_logs)))]
+
+        return {
+            "metadata": self.metadata,
+            "raw": list(self.raw_logs),
+            "columns": {name: values(column) for name, column in self.columns.items()},
+            "insights": {name: values(self.entry_columns[name]) for name in ENTRY_FIELDS if name != "security_match"},
+        }
@@ -0,0 +1,79 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATTERN_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "sherlock", "security_patterns.json")
+DEFAULT_PATTERN_CACHE_TTL = 7 * 24 * 3600
+
+
+def valid_patterns(patterns, flags: int = re.IGNORECASE) -> List[str]:
+    """Keep the patterns that are strings and compile"""
+    valid = []
+    for pattern in patterns or []:
+        if not isinstance(pattern, str):
+            logger.warning("Dropping non-string security pattern %r", pattern)
+            continue
+        try:
+            re.compile(pattern, flags)
+        except re.error as e:
+            logger.warning("Dropping invalid security pattern %r: %s", pattern, e)
+            continue
+        valid.append(pattern)
+    return valid
+
+
+class PatternCache:
+    """
+    Persistent cache of LLM-generated security patterns.
+
+    Entries are keyed by log format, model id and prompt version, so changing the model
+    or the prompt invalidates them, and expire after `ttl` seconds. Only patterns that
+    compile are cached. Stored as a JSON file written atomically; safe to share between threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATTERN_CACHE_PATH, ttl: float = DEFAULT_PATTERN_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable pattern cache %s: %s", path, e)
+
+    @staticmethod
+    def _key(log_format: str, model_id: str, prompt_version: str) -> str:
+        return f"{model_id}|{prompt_version}|{log_format}"
+
+    def get(self, log_format: str, model_id: str, prompt_version: str) -> Optional[List[str]]:
+        """Cached patterns, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(self._key(log_format, model_id, prompt_version))
+        if entry is None or time.time() - entry["created_at"] > self.ttl:
+            return None
+        return list(entry["patterns"])
+
+    def put(self, log_format: str, model_id: str, prompt_version: str, patterns) -> List[str]:
+        """Validate and cache patterns; returns the valid ones. Nothing is cached if none are valid"""
+        patterns = valid_patterns(patterns)
+        if not patterns:
+            return patterns
+        with self._lock:
+            self._entries[self._key(log_format, model_id, prompt_version)] = {
+                "patterns": patterns,
+                "created_at": time.time(),
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        return patterns
@@ -0,0 +1,108 @@
+from collections import Counter
+from typing import Dict, Iterator, List
+
+from parsed_log_batch import ParsedLogBatch
+from metrics import Metrics
+
+DEFAULT_OBJECT_WORKERS = 4
+
+
+def iter_object_keys(s3_client, bucket: str, prefix: str) -> Iterator[str]:
+    """List the object keys under a prefix, following list_objects_v2 pagination"""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            # Skip "folder" placeholder objects
+            if obj["Key"].endswith("/") and not obj.get("Size"):
+                continue
+            yield obj["Key"]
+
+
+class PrefixScanResult:
+    """
+    Critical entries of every object scanned under a prefix, kept as one batch per object.
+
+    Iterating yields the entries of all objects in listing order, each tagged with the
+    object key under "source", so it can be used wherever a ParsedLogBatch is expected.
+    Without `keep_entries` (the entries were streamed elsewhere, see report_sinks.ReportEvents)
+    only the per-object counts of `stats` are kept.
+    """
+
+    def __init__(self, bucket: str, prefix: str, keep_entries: bool = True):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.keep_entries = keep_entries
+        self.batches: Dict[str, ParsedLogBatch] = {}
+        self.errors: Dict[str, str] = {}
+        self.critical_lines: Dict[str, int] = {}
+        self.lines_by_severity = Counter()
+        self.objects_by_format = Counter()
+        # Sketch statistics merged across objects (sketches.LogStatistics), or None if they were not collected
+        self.statistics = None
+
+    def add(self, key: str, batch: ParsedLogBatch):
+        self.critical_lines[key] = batch.line_count()
+        self.lines_by_severity.update(batch.lines_by_severity())
+        self.objects_by_format[batch.metadata.get("format", "unknown")] += 1
+        if not self.keep_entries:
+            return
+        # Each object's sketches are folded into the running statistics as it completes,
+        # instead of keeping a full LogStatistics per object until the end of the scan
+        if batch.statistics is not None:
+            if self.statistics is None:
+                self.statistics = batch.statistics
+            else:
+                self.statistics.merge(batch.statistics)
+            batch.statistics = None
+        self.batches[key] = batch
+
+    def add_error(self, key: str, error: Exception):
+        self.errors[key] = str(error)
+
+    def __len__(self):
+        return sum(len(batch) for batch in self.batches.values())
+
+    def line_count(self) -> int:
+        """Critical lines of every object, counting every line of the templates"""
+        return sum(batch.line_count() for batch in self.batches.values())
+
+    def __iter__(self) -> Iterator[Dict]:
+        for key, batch in self.batches.items():
+            for entry in batch:
+                entry["source"] = key
+                yield entry
+
+    def iter_events(self) -> Iterator[Dict]:
+        """Serialize entries the way run_analysis reports them, with the object each came from"""
+        for key, batch in self.batches.items():
+            for event in batch.iter_events():
+                event["source"] = key
+                yield event
+
+    def to_events(self) -> List[Dict]:
+        return list(self.iter_events())
+
+    @property
+    def window_events(self) -> List[Dict]:
+        return [dict(event, source=key) for key, batch in self.batches.items() for event in batch.window_events]
+
+    @property
+    def metrics(self) -> Metrics:
+        """Scan metrics summed across objects"""
+        merged = Metrics()
+        for batch in self.batches.values():
+            if batch.metrics is not None:
+                merged.merge(batch.metrics)
+        return merged
+
+    def stats(self) -> Dict:
+        """Summary statistics merged across objects"""
+        return {
+            "prefix": f"s3://{self.bucket}/{self.prefix}",
+            "objects_scanned": len(self.critical_lines),
+            "objects_failed": len(self.errors),
+            "critical_events_by_object": dict(self.critical_lines),
+            "critical_events_by_severity": dict(self.lines_by_severity),
+            "objects_by_format": dict(self.objects_by_format),
+            "errors": dict(self.errors),
+        }
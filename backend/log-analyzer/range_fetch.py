@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from bounded_futures import BoundedFutures
+from log_sources import DEFAULT_SAMPLE_LINES, DEFAULT_SAMPLE_WINDOW, sample_lines
+
+DEFAULT_RANGE_SIZE = 8 * 1024 * 1024
+
+
+def object_size(s3_client, bucket: str, key: str) -> int:
+    """Return the size in bytes of an S3 object"""
+    return s3_client.head_object(Bucket=bucket, Key=key)['ContentLength']
+
+
+def plan_ranges(size: int, range_size: int = DEFAULT_RANGE_SIZE) -> List[Tuple[int, int]]:
+    """Split [0, size) into inclusive (start, end) byte ranges of at most range_size bytes"""
+    return [(start, min(start + range_size, size) - 1) for start in range(0, size, range_size)]
+
+
+def fetch_range(s3_client, bucket: str, key: str, start: int, end: int) -> bytes:
+    """Fetch bytes start..end (inclusive) of an S3 object with a ranged GET"""
+    response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
+    body = response['Body']
+    try:
+        return body.read()
+    finally:
+        body.close()
+
+
+def sample_s3_lines(s3_client, bucket: str, key: str, window_size: int = DEFAULT_SAMPLE_WINDOW,
+                    max_lines: int = DEFAULT_SAMPLE_LINES) -> Optional[List[str]]:
+    """Sample lines from the head, middle and tail of an uncompressed S3 object with ranged GETs"""
+    return sample_lines(lambda start, end: fetch_range(s3_client, bucket, key, start, end),
+                        object_size(s3_client, bucket, key), window_size, max_lines)
+
+
+def iter_aligned_ranges(s3_client, bucket: str, key: str, range_size: int = DEFAULT_RANGE_SIZE,
+                        fetch_workers: int = 8) -> Iterator[bytes]:
+    """
+    Fetch an S3 object with concurrent ranged GETs and yield it as blocks that end on a line boundary.
+
+    Blocks are yielded in object order. The partial last line of each range is carried over to the
+    next block, and at most 2 * fetch_workers ranges are in flight so memory stays bounded.
+    """
+    ranges = plan_ranges(object_size(s3_client, bucket, key), range_size)
+    if not ranges:
+        return
+
+    def fetched():
+        for range_start, range_end in ranges:
+            yield from fetches.submit(fetch_range, s3_client, bucket, key, range_start, range_end)
+        yield from fetches.drain()
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+        fetches = BoundedFutures(executor, 2 * fetch_workers)
+        carry = b""
+        try:
+            for future in fetched():
+                data = future.result()
+                if carry:
+                    data = carry + data
+                cut = data.rfind(b"\n")
+                if cut == -1:
+                    carry = data
+                    continue
+                carry = data[cut + 1:]
+                yield data[:cut + 1]
+        finally:
+            # Don't fetch the remaining ranges if the consumer stops early
+            fetches.cancel()
+        if carry:
+            yield carry
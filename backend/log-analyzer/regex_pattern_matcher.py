@@ -1,22 +1,30 @@
 import re
 from typing import Dict, List, Optional
 
+
+def _compile(pattern: str) -> re.Pattern:
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"Invalid regex pattern: {e}")
+
+
 class RegexPatternMatcher:
     def __init__(self):
         self.compiled_patterns = {}
 
+    def _compiled(self, pattern: str) -> re.Pattern:
+        compiled = self.compiled_patterns.get(pattern)
+        if compiled is None:
+            compiled = self.compiled_patterns[pattern] = _compile(pattern)
+        return compiled
+
     def match_pattern(self, log_entry: str, pattern: str) -> Optional[Dict]:
         """
         Match a log entry against a regex pattern with named groups
         Returns dict of named group matches or None if no match
         """
-        if pattern not in self.compiled_patterns:
-            try:
-                self.compiled_patterns[pattern] = re.compile(pattern)
-            except re.error as e:
-                raise ValueError(f"Invalid regex pattern: {e}")
-
-        match = self.compiled_patterns[pattern].match(log_entry)
+        match = self._compiled(pattern).match(log_entry)
         if match:
             return match.groupdict()
         return None
@@ -26,4 +34,4 @@ class RegexPatternMatcher:
         Match multiple log entries against a pattern
         Returns list of match results (dict or None)
         """
-        return [self.match_pattern(entry, pattern) for entry in log_entries]
\ No newline at end of file
+        return [self.match_pattern(entry, pattern) for entry in log_entries]
@@ -0,0 +1,315 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from bounded_futures import BoundedFutures
+from parsed_log_batch import ParsedLogBatch, entry_event
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+    parquet = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROW_GROUP_SIZE = 10000
+# S3 requires every part but the last to be at least 5 MiB
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_UPLOAD_WORKERS = 4
+
+
+def ndjson_record(record_type: str, record: Dict) -> bytes:
+    """One NDJSON line tagged with its record type ("event" or "summary")"""
+    return (json.dumps({"record": record_type, **record}, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+
+class ReportSink(ABC):
+    """
+    Destination of an analysis report.
+
+    run_analysis passes the critical events one at a time as the scan keeps them (see
+    ReportEvents), then the summary, then closes the sink; `abort` is called instead of
+    `close` if the report could not be completed.
+    """
+
+    @abstractmethod
+    def write_event(self, event: Dict):
+        pass
+
+    @abstractmethod
+    def write_summary(self, summary: Dict):
+        pass
+
+    def close(self):
+        pass
+
+    def abort(self):
+        self.close()
+
+
+class LoggingSink(ReportSink):
+    """Logs each critical event; the sink run_analysis reports to when none is configured"""
+
+    def write_event(self, event):
+        logger.info("Critical event: %s", json.dumps(event, default=str))
+
+    def write_summary(self, summary):
+        # run_analysis logs the summary itself
+        pass
+
+
+class ReportEvents:
+    """
+    Stands in for a ParsedLogBatch in LogScanner and LogAnalyzer, writing each critical
+    entry to the report sinks as soon as it is kept instead of holding the whole batch.
+
+    Only what the summary needs is kept: entry and line counts, lines per severity, and
+    the window events, statistics and metrics of the scans. An entry standing for a
+    template is held until `flush`, since the lines of its template are only counted at
+    the end of its scan.
+    """
+
+    # Entries may wait for a full insight buffer and stand for a template (see LogScanner.scan)
+    immediate = False
+
+    def __init__(self, sinks: List[ReportSink]):
+        self.sinks = list(sinks)
+        self.count = 0
+        # Filled in by LogScanner.scan for the templates of the held entries
+        self.template_counts: Dict[str, int] = {}
+        # Whether any scan used templates (see ParsedLogBatch.templated)
+        self.templated = False
+        self.window_events: List[Dict] = []
+        self.statistics = None
+        self.metrics = None
+        self._lines = 0
+        self._by_severity = Counter()
+        # (source, template) -> [log_entry, lines]; lines is None until the scan counts the template
+        self._held: Dict[tuple, list] = {}
+
+    def __len__(self):
+        return self.count + len(self._held)
+
+    def _write(self, log_entry: Dict, lines: int, source: Optional[str]):
+        event = entry_event(log_entry, lines)
+        if source is not None:
+            event["source"] = source
+        self.count += 1
+        self._lines += lines
+        severity = log_entry.get("severity")
+        if isinstance(severity, str):
+            self._by_severity[severity] += lines
+        for sink in self.sinks:
+            sink.write_event(event)
+
+    def _hold(self, log_entry: Dict, lines: Optional[int], source: Optional[str]):
+        held = self._held.get((source, log_entry["template"]))
+        if held is None:
+            self._held[(source, log_entry["template"])] = [log_entry, lines]
+        else:
+            # The same template in another block of the object (see ParsedLogBatch.extend)
+            held[1] += lines
+
+    def _held_lines(self, log_entry: Dict, lines: Optional[int]) -> int:
+        return self.template_counts.get(log_entry["template"], 1) if lines is None else lines
+
+    def append(self, log_entry: Dict):
+        if log_entry.get("template") is not None:
+            self._hold(log_entry, None, None)
+        else:
+            self._write(log_entry, 1, None)
+
+    def templates(self, start: int = 0) -> List[str]:
+        """Templates of the held entries whose lines have not been counted yet"""
+        return [log_entry["template"] for log_entry, lines in self._held.values() if lines is None]
+
+    def extend(self, batch: ParsedLogBatch, source: Optional[str] = None):
+        """
+        Write the entries of a batch scanned elsewhere (a block of the object, or an object
+        of a prefix scan, tagged with its key as `source`) and merge its scan results
+        """
+        for log_entry, lines in zip(batch, batch.line_counts()):
+            if log_entry.get("template") is not None:
+                self._hold(log_entry, lines, source)
+            else:
+                self._write(log_entry, lines, source)
+        self.templated = self.templated or batch.templated
+        if source is None:
+            self.window_events.extend(batch.window_events)
+        else:
+            self.window_events.extend(dict(event, source=source) for event in batch.window_events)
+        if batch.statistics is not None:
+            if self.statistics is None:
+                self.statistics = batch.statistics
+            else:
+                self.statistics.merge(batch.statistics)
+        if batch.metrics is not None:
+            if self.metrics is None:
+                self.metrics = batch.metrics
+            else:
+                self.metrics.merge(batch.metrics)
+
+    def flush(self):
+        """Write the held template entries, now that their lines are counted"""
+        held, self._held = self._held, {}
+        for (source, _), (log_entry, lines) in held.items():
+            self._write(log_entry, self._held_lines(log_entry, lines), source)
+
+    def line_count(self) -> int:
+        """Critical lines, counting every line of the templates"""
+        return self._lines + sum(self._held_lines(log_entry, lines) for log_entry, lines in self._held.values())
+
+    def lines_by_severity(self) -> Dict[str, int]:
+        """Critical lines per severity, counting every line of the templates"""
+        by_severity = Counter(self._by_severity)
+        for log_entry, lines in self._held.values():
+            severity = log_entry.get("severity")
+            if isinstance(severity, str):
+                by_severity[severity] += self._held_lines(log_entry, lines)
+        return dict(by_severity)
+
+
+class NDJSONSink(ReportSink):
+    """Local NDJSON file: one line per event, followed by one summary line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+
+    def write_event(self, event):
+        self.file.write(ndjson_record("event", event))
+
+    def write_summary(self, summary):
+        self.file.write(ndjson_record("summary", summary))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink(ReportSink):
+    """
+    Parquet file of the events, written in row groups of `row_group_size`.
+
+    The extracted fields differ between log formats, so they are stored as a JSON
+    string column, as is the format metadata of each event, which differs between the
+    objects of a prefix scan; the summary goes in the file's key-value metadata. Events standing for a template (see templating) fill the template and
+    count columns, other events have a null template and a count of one. Requires pyarrow.
+    """
+
+    def __init__(self, path: str, row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        if pyarrow is None:
+            raise ValueError("Parquet reports require the pyarrow package")
+        self.path = path
+        self.row_group_size = row_group_size
+        self.schema = pyarrow.schema([("source", pyarrow.string()), ("raw", pyarrow.string()), ("data", pyarrow.string()),
+                                      ("template", pyarrow.string()), ("count", pyarrow.int64()),
+                                      ("metadata", pyarrow.string())])
+        self.writer = parquet.ParquetWriter(path, self.schema)
+        self.rows: Dict[str, List] = {name: [] for name in self.schema.names}
+        # The events of a batch share its metadata dict, which is serialized once per run of events
+        self._metadata = self._metadata_json = None
+
+    def _flush(self):
+        if self.rows["raw"]:
+            self.writer.write_table(pyarrow.table(self.rows, schema=self.schema))
+            for values in self.rows.values():
+                values.clear()
+
+    def write_event(self, event):
+        metadata = event.get("metadata")
+        if metadata is not self._metadata:
+            self._metadata, self._metadata_json = metadata, json.dumps(metadata, default=str)
+        self.rows["source"].append(event.get("source"))
+        self.rows["raw"].append(event["raw"])
+        self.rows["data"].append(json.dumps(event["data"], default=str))
+        self.rows["template"].append(event.get("template"))
+        self.rows["count"].append(event.get("count", 1))
+        self.rows["metadata"].append(self._metadata_json)
+        if len(self.rows["raw"]) >= self.row_group_size:
+            self._flush()
+
+    def write_summary(self, summary):
+        self._flush()
+        self.writer.add_key_value_metadata({"summary": json.dumps(summary, default=str)})
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+class S3MultipartSink(ReportSink):
+    """
+    NDJSON report uploaded to S3 with a multipart upload.
+
+    Lines are buffered into parts of `part_size` bytes, and each full part is uploaded
+    in the background by up to `upload_workers` threads while the report is still being
+    written, so neither the report nor more than a few parts are held in memory. The
+    upload is only started with the first part, and aborted if the report is not completed.
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE,
+                 upload_workers: int = DEFAULT_UPLOAD_WORKERS):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.upload_workers = upload_workers
+        self.upload_id = None
+        self.buffer = bytearray()
+        self.parts: List[Dict] = []
+        self.executor = ThreadPoolExecutor(max_workers=upload_workers)
+        self.pending = BoundedFutures(self.executor, 2 * upload_workers)
+
+    def _upload_part(self, part_number: int, data: bytes) -> Dict:
+        response = self.s3_client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                              PartNumber=part_number, Body=data)
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def _submit_part(self):
+        if self.upload_id is None:
+            self.upload_id = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=self.key)["UploadId"]
+        part_number = len(self.parts) + len(self.pending) + 1
+        uploaded = self.pending.submit(self._upload_part, part_number, bytes(self.buffer))
+        self.buffer.clear()
+        for future in uploaded:
+            self.parts.append(future.result())
+
+    def _write(self, data: bytes):
+        self.buffer += data
+        if len(self.buffer) >= self.part_size:
+            self._submit_part()
+
+    def write_event(self, event):
+        self._write(ndjson_record("event", event))
+
+    def write_summary(self, summary):
+        self._write(ndjson_record("summary", summary))
+
+    def close(self):
+        try:
+            if self.buffer or not (self.parts or self.pending):
+                self._submit_part()
+            for future in self.pending.drain():
+                self.parts.append(future.result())
+            self.s3_client.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                                     MultipartUpload={"Parts": self.parts})
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self.executor.shutdown()
+
+    def abort(self):
+        self.pending.cancel()
+        self.executor.shutdown()
+        if self.upload_id is None:
+            return
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        except Exception as e:
+            logger.error("Aborting the upload of s3://%s/%s failed: %s", self.bucket, self.key, e)
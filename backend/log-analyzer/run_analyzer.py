@@ -1,6 +1,20 @@
 import os
+import boto3
 from dotenv import load_dotenv
-from log_analyzer import LogAnalyzer
+from log_analyzer import DummySecurityInsightGenerator, LogAnalyzer
+from bedrock_insights import (DEFAULT_INSIGHT_BATCH_SIZE, DEFAULT_INSIGHT_CONCURRENCY, DEFAULT_REQUESTS_PER_SECOND,
+                              BedrockSecurityInsightGenerator)
+from log_sources import DEFAULT_CHUNK_SIZE
+from range_fetch import DEFAULT_RANGE_SIZE
+from local_s3 import LocalS3Client
+from prefix_scan import DEFAULT_OBJECT_WORKERS
+from checkpoint import CheckpointStore
+from follow import DEFAULT_POLL_INTERVAL, format_event
+from pattern_cache import DEFAULT_PATTERN_CACHE_PATH, DEFAULT_PATTERN_CACHE_TTL, PatternCache
+from report_sinks import NDJSONSink, ParquetSink, S3MultipartSink
+from multiline import DEFAULT_MAX_RECORD_LINES, MULTILINE_RULES, RecordAssembler
+from templating import DEFAULT_MAX_TEMPLATES
+import json
 import logging
 import argparse
 
@@ -11,6 +25,57 @@ logger = logging.getLogger(__name__)
 def main():
     parser = argparse.ArgumentParser(description="Run Log Analyzer")
     parser.add_argument('--verbose', action='store_true', help="Enable verbose output and intermediate step logging.")
+    parser.add_argument('--stream', action='store_true', help="Stream the S3 object in chunks instead of reading it whole.")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Chunk size in bytes used by --stream.")
+    parser.add_argument('--workers', type=int, default=1, help="Scan with N worker processes over concurrent ranged GETs.")
+    parser.add_argument('--range-size', type=int, default=DEFAULT_RANGE_SIZE, help="Byte range size used by --workers.")
+    parser.add_argument('--bucket', default="mysherlockbucket", help="S3 bucket holding the logs.")
+    parser.add_argument('--key', default="synthetic_critical_events.log", help="S3 object to analyze.")
+    parser.add_argument('--prefix', help="Analyze every object under this S3 prefix instead of --key.")
+    parser.add_argument('--object-workers', type=int, default=DEFAULT_OBJECT_WORKERS,
+                        help="Number of objects analyzed concurrently with --prefix.")
+    parser.add_argument('--checkpoint', help="Checkpoint file; each run only analyzes what was appended since the last one.")
+    parser.add_argument('--follow', action='store_true',
+                        help="Keep following the log and print critical events as JSON lines as they arrive.")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Seconds between checks for new data with --follow.")
+    parser.add_argument('--from-start', action='store_true', help="With --follow, also scan the existing content.")
+    parser.add_argument('--pattern-cache', default=DEFAULT_PATTERN_CACHE_PATH,
+                        help="File caching the LLM-generated security patterns per log format.")
+    parser.add_argument('--pattern-cache-ttl', type=float, default=DEFAULT_PATTERN_CACHE_TTL,
+                        help="Seconds before cached security patterns are regenerated.")
+    parser.add_argument('--no-pattern-cache', action='store_true', help="Always prompt the LLM for security patterns.")
+    parser.add_argument('--window-aggregation', action='store_true',
+                        help="Detect brute-force logins and scans over sliding time windows.")
+    parser.add_argument('--statistics', action='store_true',
+                        help="Report top client IPs, top URLs and distinct IPs using fixed-memory sketches.")
+    parser.add_argument('--llm-insights', action='store_true',
+                        help="Triage matched lines with a Bedrock model; it can raise, not lower, the built-in rule severity.")
+    parser.add_argument('--insight-batch-size', type=int, default=DEFAULT_INSIGHT_BATCH_SIZE,
+                        help="Log lines sent per prompt with --llm-insights.")
+    parser.add_argument('--insight-concurrency', type=int, default=DEFAULT_INSIGHT_CONCURRENCY,
+                        help="Prompts in flight at once with --llm-insights.")
+    parser.add_argument('--insight-rps', type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help="Maximum prompts per second with --llm-insights.")
+    parser.add_argument('--multiline', choices=MULTILINE_RULES,
+                        help="Group continuation lines into records: indented lines and stack trace lines (indent), "
+                             "or every line up to the next timestamped one (timestamp).")
+    parser.add_argument('--multiline-start',
+                        help="Regex matching the first line of a record; other lines continue the previous record.")
+    parser.add_argument('--multiline-max-lines', type=int, default=DEFAULT_MAX_RECORD_LINES,
+                        help="Maximum lines per multiline record.")
+    parser.add_argument('--templates', action='store_true',
+                        help="Evaluate lines that only differ by their digits (timestamps, IPs, ids) once, "
+                             "reporting one event per template with its line count.")
+    parser.add_argument('--max-templates', type=int, default=DEFAULT_MAX_TEMPLATES,
+                        help="Templates of non-matching lines remembered per scan with --templates.")
+    parser.add_argument('--report-ndjson', help="Write the critical events and the summary to this NDJSON file.")
+    parser.add_argument('--report-parquet', help="Write the critical events to this Parquet file (requires pyarrow).")
+    parser.add_argument('--report-s3', help="Upload the NDJSON report to this s3://bucket/key.")
+    parser.add_argument('--metrics-prometheus',
+                        help="Write the pipeline metrics to this file in Prometheus text format after the run.")
+    parser.add_argument('--local-path', help="Analyze this local log file instead of the S3 object.")
+    parser.add_argument('--local-s3-root', help="Serve bucket/key from this directory instead of S3.")
     args = parser.parse_args()
 
     if args.verbose:
@@ -23,24 +88,73 @@ def main():
     # Load environment variables
     load_dotenv()
     
-    # Get S3 bucket and key from environment
-    bucket = "mysherlockbucket"
-    key = "synthetic_critical_events.log"
+    bucket = args.bucket
+    key = args.key
     
     if not bucket or not key:
-        logger.error("Missing S3 bucket or key in environment variables")
+        logger.error("Missing S3 bucket or key")
         return
     
-    logger.info(f"Starting log analysis for s3://{bucket}/{key}")
+    if args.local_path:
+        logger.info(f"Starting log analysis for {args.local_path}")
+    elif args.prefix is not None:
+        logger.info(f"Starting log analysis for every object under s3://{bucket}/{args.prefix}")
+    else:
+        logger.info(f"Starting log analysis for s3://{bucket}/{key}")
     
     # Initialize and run analyzer
-    analyzer = LogAnalyzer(bucket, key)
+    s3_client = LocalS3Client(args.local_s3_root) if args.local_s3_root else None
+    insight_generator = None
+    if args.llm_insights:
+        insight_generator = BedrockSecurityInsightGenerator(
+            boto3.client('bedrock-runtime', region_name=os.getenv('AWS_DEFAULT_REGION')),
+            fallback=DummySecurityInsightGenerator(), batch_size=args.insight_batch_size,
+            max_concurrency=args.insight_concurrency, requests_per_second=args.insight_rps)
+    record_assembler = None
+    if args.multiline_start:
+        record_assembler = RecordAssembler(args.multiline_start, continuation_pattern=None,
+                                           max_lines=args.multiline_max_lines)
+    elif args.multiline:
+        record_assembler = RecordAssembler.from_rule(args.multiline, args.multiline_max_lines)
+    analyzer = LogAnalyzer(bucket, key, streaming=args.stream, chunk_size=args.chunk_size,
+                           workers=args.workers, range_size=args.range_size, s3_client=s3_client,
+                           local_path=args.local_path,
+                           s3_prefix=args.prefix, object_workers=args.object_workers,
+                           checkpoint_store=CheckpointStore(args.checkpoint) if args.checkpoint else None,
+                           pattern_cache=None if args.no_pattern_cache else PatternCache(args.pattern_cache,
+                                                                                         args.pattern_cache_ttl),
+                           window_aggregation=args.window_aggregation, log_statistics=args.statistics,
+                           insight_generator=insight_generator, record_assembler=record_assembler,
+                           max_templates=args.max_templates if args.templates else None)
+    if args.follow:
+        logger.info("Following log, press Ctrl+C to stop")
+        try:
+            analyzer.follow(lambda entry: print(json.dumps(format_event(entry)), flush=True),
+                            verbose=args.verbose, poll_interval=args.poll_interval, from_start=args.from_start,
+                            on_window_event=lambda event: print(json.dumps(event), flush=True))
+        except KeyboardInterrupt:
+            logger.info("Follow mode stopped")
+        except Exception as e:
+            logger.error(f"Follow mode failed: {str(e)}")
+        return
+
     try:
+        sinks = []
+        if args.report_ndjson:
+            sinks.append(NDJSONSink(args.report_ndjson))
+        if args.report_parquet:
+            sinks.append(ParquetSink(args.report_parquet))
+        if args.report_s3:
+            report_bucket, _, report_key = args.report_s3.removeprefix("s3://").partition("/")
+            sinks.append(S3MultipartSink(analyzer.s3_client, report_bucket, report_key))
         if args.verbose:
             logger.debug("Running analysis in verbose mode")
-            analyzer.run_analysis('custom', verbose=True)
+            analyzer.run_analysis('custom', verbose=True, sinks=sinks)
         else:
-            analyzer.run_analysis('custom')
+            analyzer.run_analysis('custom', sinks=sinks)
+        if args.metrics_prometheus:
+            with open(args.metrics_prometheus, "w") as f:
+                f.write(analyzer.metrics.to_prometheus())
         logger.info("Analysis completed successfully")
     except Exception as e:
         logger.error(f"Analysis failed: {str(e)}")
@@ -0,0 +1,123 @@
+import logging
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from literal_prefilter import Factor, distinguishes_digits, may_match, required_literals
+
+logger = logging.getLogger(__name__)
+
+# Built-in SQL injection rules applied to every non-JSON log format
+SQL_INJECTION_RULES: Dict[str, str] = {
+    "sql_injection_boolean": r"(?i)\b(?:or|and)\b\s+['\"]?[^'\"]+['\"]?\s*=\s*['\"]?[^'\"]+['\"]?",
+    "sql_injection_keyword": r"(?i)(?:union\s+select|select\s+\*|insert\s+into|update\s+set|delete\s+from)\b",
+}
+
+# Literal keywords reported with every match; they feed the insight table but never trigger on their own
+KEYWORD_RULES: Dict[str, str] = {
+    "error_keyword": "error",
+}
+
+
+class SecurityMatch(NamedTuple):
+    """Rules that matched a line, in rule order, with the span of each rule's first match"""
+    rule_ids: Tuple[str, ...]
+    spans: Tuple[Tuple[int, int], ...]
+
+
+class SecurityPatternSet:
+    """
+    A set of security rules compiled once per analysis.
+
+    Every rule is compiled once up front and invalid rules are skipped with a warning
+    instead of failing the whole analysis. With `prefilter` enabled, the literals each
+    rule needs are derived from its parsed regex and checked with plain substring tests
+    first, so a rule's regex only runs on lines that contain them.
+
+    `keywords` are case-insensitive literal rules that are reported alongside the regex
+    rules but do not make a line match on their own.
+
+    `distinguishes_digits` tells whether lines that only differ by the values of their
+    digits may match different rules (see literal_prefilter.distinguishes_digits).
+    """
+
+    def __init__(self, rules: Union[Dict[str, str], Iterable[Tuple[str, str]]], flags: int = re.IGNORECASE,
+                 prefilter: bool = True, keywords: Optional[Dict[str, str]] = None):
+        if isinstance(rules, dict):
+            rules = rules.items()
+        self.flags = flags
+        self.rules: Dict[str, str] = {}
+        self._filtered: List[Tuple[str, Tuple[Factor, ...], re.Pattern]] = []
+        self.distinguishes_digits = False
+
+        for rule_id, pattern in rules:
+            try:
+                compiled = re.compile(pattern, flags)
+            except re.error as e:
+                logger.warning("Skipping invalid security pattern %r: %s", pattern, e)
+                continue
+            self.rules[rule_id] = pattern
+            factors = required_literals(pattern, flags) if prefilter else ()
+            self._filtered.append((rule_id, factors, compiled))
+            self.distinguishes_digits = self.distinguishes_digits or distinguishes_digits(pattern, flags)
+
+        self.keywords: Dict[str, str] = {rule_id: keyword.lower() for rule_id, keyword in (keywords or {}).items()}
+        self._keyword_patterns = {rule_id: re.compile(re.escape(keyword), re.IGNORECASE)
+                                  for rule_id, keyword in self.keywords.items()}
+        self.distinguishes_digits = self.distinguishes_digits or any(
+            character in "0123456789" for keyword in self.keywords.values() for character in keyword)
+
+    @classmethod
+    def from_patterns(cls, security_patterns: List[str], include_sql_injection: bool = True,
+                      prefilter: bool = True) -> "SecurityPatternSet":
+        """
+        Build a set from a plain list of patterns (e.g. LLM generated), plus the built-in
+        SQL injection rules and keyword rules
+        """
+        rules = [(f"security_pattern_{index}", pattern) for index, pattern in enumerate(security_patterns)]
+        if include_sql_injection:
+            rules.extend(SQL_INJECTION_RULES.items())
+        return cls(rules, prefilter=prefilter, keywords=KEYWORD_RULES)
+
+    def search(self, line: str) -> bool:
+        """Return True if any rule matches the line"""
+        if not line.isascii():
+            return any(compiled.search(line) for _, _, compiled in self._filtered)
+        lowered = line.lower()
+        for _, factors, compiled in self._filtered:
+            if may_match(lowered, factors) and compiled.search(line):
+                return True
+        return False
+
+    def scan(self, line: str, require_rule: bool = True) -> Optional[SecurityMatch]:
+        """
+        Evaluate every rule against the line once.
+
+        Returns None when no regex rule matched and `require_rule` is set; otherwise the
+        matching regex rules followed by the keywords present in the line.
+        """
+        ascii_line = line.isascii()
+        lowered = line.lower() if ascii_line else None
+        rule_ids = []
+        spans = []
+        for rule_id, factors, compiled in self._filtered:
+            if ascii_line and not may_match(lowered, factors):
+                continue
+            match = compiled.search(line)
+            if match:
+                rule_ids.append(rule_id)
+                spans.append(match.span())
+        if require_rule and not rule_ids:
+            return None
+
+        for rule_id, keyword in self.keywords.items():
+            if ascii_line:
+                start = lowered.find(keyword)
+                if start != -1:
+                    rule_ids.append(rule_id)
+                    spans.append((start, start + len(keyword)))
+            else:
+                match = self._keyword_patterns[rule_id].search(line)
+                if match:
+                    rule_ids.append(rule_id)
+                    spans.append(match.span())
+        return SecurityMatch(tuple(rule_ids), tuple(spans))
@@ -0,0 +1,220 @@
+import hashlib
+import math
+from array import array
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Distinct values buffered before they are flushed into the sketches
+FLUSH_THRESHOLD = 4096
+
+
+def hash128(value: str) -> Tuple[int, int]:
+    """Stable pair of 64-bit hashes (unlike hash(), identical across processes so sketches can be merged)"""
+    digest = hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters with at most `capacity` counters.
+
+    Every item whose true frequency exceeds n / capacity is guaranteed to be tracked.
+    Counts are overestimates by at most the reported error. Counters are grouped in
+    buckets by count (the stream-summary layout), so evicting the minimum is O(1).
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self._buckets: Dict[int, Dict[Hashable, None]] = {}
+        self._min_count = 0
+
+    def _move(self, item: Hashable, old: int, new: int):
+        buckets = self._buckets
+        if old:
+            bucket = buckets[old]
+            del bucket[item]
+            if not bucket:
+                del buckets[old]
+        buckets.setdefault(new, {})[item] = None
+        self.counts[item] = new
+        if new < self._min_count or self._min_count not in buckets:
+            self._min_count = min(buckets)
+
+    def add(self, item: Hashable, count: int = 1):
+        old = self.counts.get(item)
+        if old is not None:
+            self._move(item, old, old + count)
+        elif len(self.counts) < self.capacity:
+            self.errors[item] = 0
+            self._move(item, 0, count)
+        else:
+            # Replace a smallest counter; the new item inherits its count as error
+            floor = self._min_count
+            bucket = self._buckets[floor]
+            victim = next(iter(bucket))
+            del bucket[victim]
+            if not bucket:
+                del self._buckets[floor]
+            del self.counts[victim], self.errors[victim]
+            self.errors[item] = floor
+            self._move(item, 0, floor + count)
+
+    def merge(self, other: "SpaceSaving"):
+        for item, count in other.counts.items():
+            self.add(item, count)
+            self.errors[item] += other.errors[item]
+
+    def top(self, k: int = 10) -> List[Tuple[Hashable, int, int]]:
+        """The k largest counters as (item, count, max_error)"""
+        items = sorted(self.counts, key=self.counts.get, reverse=True)[:k]
+        return [(item, self.counts[item], self.errors[item]) for item in items]
+
+
+class CountMinSketch:
+    """Count-Min sketch: frequency estimates that never undercount, in width * depth counters"""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array('Q', bytes(8 * width)) for _ in range(depth)]
+
+    def _indexes(self, hashes: Tuple[int, int]):
+        # Kirsch-Mitzenmacher: derive all row hashes from two
+        h1, h2 = hashes[0], hashes[1] | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, item: str, count: int = 1, hashes: Optional[Tuple[int, int]] = None):
+        for row, index in zip(self.rows, self._indexes(hashes or hash128(item))):
+            row[index] += count
+
+    def estimate(self, item: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(hash128(item))))
+
+    def merge(self, other: "CountMinSketch"):
+        for row, other_row in zip(self.rows, other.rows):
+            for index, value in enumerate(other_row):
+                if value:
+                    row[index] += value
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2**precision one-byte registers (~1.04 / sqrt(2**p) relative error)"""
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item: str, hashes: Optional[Tuple[int, int]] = None):
+        h = (hashes or hash128(item))[1]
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class LogStatistics:
+    """
+    Fixed-memory summary statistics of a log, fed with the parsed fields of every line.
+
+    Tracks the top client IPs and URLs (Space-Saving, with counts tightened by a
+    Count-Min sketch) and the number of distinct client IPs (HyperLogLog). Used as a
+    LogScanner observer.
+    """
+
+    def __init__(self, top_k: int = 10, capacity: int = 200, ip_fields=("client_ip", "source_ip", "srcaddr"),
+                 url_fields=("request_url",)):
+        self.top_k = top_k
+        self.ip_fields = ip_fields
+        self.url_fields = url_fields
+        self.lines = 0
+        self.top_ips = SpaceSaving(capacity)
+        self.top_urls = SpaceSaving(capacity)
+        self.ip_counts = CountMinSketch()
+        self.url_counts = CountMinSketch()
+        self.distinct_ips = HyperLogLog()
+        # IPs and URLs repeat a lot, so they are counted exactly in small buffers and flushed
+        # into the sketches as weighted updates, hashing each distinct value once per flush
+        self._pending_ips: Counter = Counter()
+        self._pending_urls: Counter = Counter()
+
+    def flush(self):
+        for ip, count in self._pending_ips.items():
+            hashes = hash128(ip)
+            self.top_ips.add(ip, count)
+            self.ip_counts.add(ip, count, hashes)
+            self.distinct_ips.add(ip, hashes)
+        for url, count in self._pending_urls.items():
+            self.top_urls.add(url, count)
+            self.url_counts.add(url, count, hash128(url))
+        self._pending_ips.clear()
+        self._pending_urls.clear()
+
+    @staticmethod
+    def _first(extracted_data: Dict, fields) -> Optional[str]:
+        for field in fields:
+            value = extracted_data.get(field)
+            if isinstance(value, str) and value:
+                return value
+        return None
+
+    def observe(self, extracted_data: Optional[Dict]):
+        self.lines += 1
+        if not extracted_data:
+            return
+        ip = self._first(extracted_data, self.ip_fields)
+        if ip is not None:
+            self._pending_ips[ip] += 1
+        url = self._first(extracted_data, self.url_fields)
+        if url is not None:
+            self._pending_urls[url] += 1
+        if len(self._pending_ips) + len(self._pending_urls) >= FLUSH_THRESHOLD:
+            self.flush()
+
+    def collect(self, critical_entries):
+        if critical_entries.statistics is None:
+            critical_entries.statistics = self
+        else:
+            critical_entries.statistics.merge(self)
+
+    def merge(self, other: "LogStatistics"):
+        self.flush()
+        other.flush()
+        self.lines += other.lines
+        self.top_ips.merge(other.top_ips)
+        self.top_urls.merge(other.top_urls)
+        self.ip_counts.merge(other.ip_counts)
+        self.url_counts.merge(other.url_counts)
+        self.distinct_ips.merge(other.distinct_ips)
+
+    @staticmethod
+    def _top(space_saving: SpaceSaving, count_min: CountMinSketch, k: int) -> List[Dict]:
+        # Both structures only overestimate, so the smaller of the two is the tighter bound
+        return [
+            {"value": item, "count": min(count, count_min.estimate(item)), "max_error": error}
+            for item, count, error in space_saving.top(k)
+        ]
+
+    def summary(self) -> Dict:
+        self.flush()
+        return {
+            "lines": self.lines,
+            "top_client_ips": self._top(self.top_ips, self.ip_counts, self.top_k),
+            "top_urls": self._top(self.top_urls, self.url_counts, self.top_k),
+            "distinct_client_ips": self.distinct_ips.count(),
+        }
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The analyzer modules are imported as top-level modules, as run_analyzer.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# LogAnalyzer creates a Bedrock client, which needs a region even though the tests never call it
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -0,0 +1,100 @@
+import gzip
+import os
+
+import pytest
+
+from checkpoint import CheckpointStore
+from local_s3 import LocalS3Client
+from log_analyzer import LogAnalyzer
+
+BUCKET = "logs"
+KEY = "access.log"
+
+BENIGN = '203.0.113.45 - - [06/Apr/2025:02:14:{:02d} +0000] "GET /index.html HTTP/1.1" 200 532\n'
+ATTACK = '198.51.100.7 - - [06/Apr/2025:02:15:{:02d} +0000] "GET /items?id=1 UNION SELECT password FROM users HTTP/1.1" 200 91\n'
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    (tmp_path / BUCKET).mkdir()
+    path = tmp_path / BUCKET / KEY
+    path.write_text("".join(BENIGN.format(second) for second in range(5)) + ATTACK.format(0))
+    return path
+
+
+def _analyze(tmp_path):
+    analyzer = LogAnalyzer(BUCKET, KEY, s3_client=LocalS3Client(str(tmp_path)), security_patterns=[],
+                           checkpoint_store=CheckpointStore(str(tmp_path / "checkpoints.json")))
+    return analyzer, analyzer.analyze_logs()
+
+
+def _append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def test_resumes_after_the_last_analyzed_line(tmp_path, log_path):
+    analyzer, batch = _analyze(tmp_path)
+    assert [entry["raw_log"] for entry in batch] == [ATTACK.format(0).rstrip("\n")]
+    assert analyzer.checkpoint.offset == log_path.stat().st_size
+
+    _append(log_path, BENIGN.format(10) + ATTACK.format(1))
+    analyzer, batch = _analyze(tmp_path)
+    assert [entry["raw_log"] for entry in batch] == [ATTACK.format(1).rstrip("\n")]
+    assert analyzer.checkpoint.offset == log_path.stat().st_size
+    assert analyzer.checkpoint.aggregates["runs"] == 2
+    assert analyzer.checkpoint.aggregates["critical_events"] == 2
+
+
+def test_unchanged_object_is_not_scanned_again(tmp_path, log_path):
+    _analyze(tmp_path)
+    analyzer, batch = _analyze(tmp_path)
+    assert len(batch) == 0
+    assert analyzer.checkpoint.aggregates["critical_events"] == 1
+
+
+def test_new_etag_without_new_bytes_fetches_nothing(tmp_path, log_path):
+    analyzer, _ = _analyze(tmp_path)
+    etag = analyzer.checkpoint.etag
+    # Same content, new ETag: a GET from byte `size` would fail with 416
+    stat = log_path.stat()
+    os.utime(log_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    analyzer, batch = _analyze(tmp_path)
+    assert len(batch) == 0
+    assert analyzer.checkpoint.etag != etag
+    assert analyzer.checkpoint.offset == log_path.stat().st_size
+    assert analyzer.checkpoint.aggregates["critical_events"] == 1
+
+    _append(log_path, ATTACK.format(4))
+    analyzer, batch = _analyze(tmp_path)
+    assert [entry["raw_log"] for entry in batch] == [ATTACK.format(4).rstrip("\n")]
+
+
+def test_partial_last_line_is_analyzed_once_complete(tmp_path, log_path):
+    attack = ATTACK.format(2)
+    _append(log_path, attack[:40])
+    analyzer, batch = _analyze(tmp_path)
+    assert len(batch) == 1
+    assert analyzer.checkpoint.offset == log_path.stat().st_size - 40
+
+    _append(log_path, attack[40:])
+    analyzer, batch = _analyze(tmp_path)
+    assert [entry["raw_log"] for entry in batch] == [attack.rstrip("\n")]
+
+
+def test_rewritten_object_is_analyzed_from_the_start(tmp_path, log_path):
+    _analyze(tmp_path)
+    log_path.write_text(ATTACK.format(3) + "".join(BENIGN.format(second) for second in range(10)))
+    analyzer, batch = _analyze(tmp_path)
+    assert [entry["raw_log"] for entry in batch] == [ATTACK.format(3).rstrip("\n")]
+    assert analyzer.checkpoint.aggregates["runs"] == 1
+
+
+def test_compressed_object_is_analyzed_whole_without_a_checkpoint(tmp_path, log_path):
+    # Rotated logs are often compressed without a compression extension in the key
+    log_path.write_bytes(gzip.compress(log_path.read_bytes()))
+    for _ in range(2):
+        analyzer, batch = _analyze(tmp_path)
+        assert [entry["raw_log"] for entry in batch] == [ATTACK.format(0).rstrip("\n")]
+        assert analyzer.checkpoint is None
+    assert not (tmp_path / "checkpoints.json").exists()
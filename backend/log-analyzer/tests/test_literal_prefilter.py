@@ -0,0 +1,66 @@
+import random
+import re
+
+import pytest
+
+from literal_prefilter import may_match, required_literals
+from security_matcher import KEYWORD_RULES, SQL_INJECTION_RULES, SecurityPatternSet
+
+# Patterns whose required literals are easy to get wrong: optional and empty branches,
+# zero-width assertions, repeats, inline flags, classes, escapes and backreferences
+ADVERSARIAL_PATTERNS = [
+    r"(?:|union)select",
+    r"(abc)?def",
+    r"a{0}bc",
+    r"(?:ab){2,}c",
+    r"x*y+z?",
+    r"(?i)SELECT\s+\*",
+    r"(?-i:Admin)panel",
+    r"[Ss]elect|[Uu]nion",
+    r"\x2e\x2e/",
+    r"\bunion\b.*\bselect\b",
+    r"^GET /",
+    r"(?=.*admin)root",
+    r"(?!guest)user=\w+",
+    r"(a|b)\1c",
+    r"café|tea",
+    r"ſelect",
+    r"kK",
+    r"(?:foo|)bar",
+    r"(?:foo|bar)+",
+    r"[^a]bc",
+    r"(?s)a.b",
+    r"\d{3}-\d{4}",
+    r"(?P<x>ab)(?P=x)",
+    r"(?>ab|a)c",
+    r"ab*+c",
+]
+
+# Fragments of the patterns' literals, mixed case, digits, separators and non-ASCII text
+FRAGMENTS = ["union", "SELECT", "select", "abc", "def", "bc", "ab", "c", "x", "y", "z", "admin", "Admin", "panel",
+             "root", "user=", "guest", "..", "/", "GET ", "caf", "é", "tea", "ſ", "elect", "k", "K",
+             "foo", "bar", "a", "b", "123", "-", "4567", " ", "*", "\t", "\n", "'", "1=1", " OR ", "--", "error", "ERROR",
+             "SELECT *", "555-1234", "union all select"]
+
+
+def _lines(count, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 8))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("pattern", ADVERSARIAL_PATTERNS)
+def test_required_literals_are_in_every_match(pattern):
+    compiled = re.compile(pattern, re.IGNORECASE)
+    factors = required_literals(pattern, re.IGNORECASE)
+    for line in _lines(3000):
+        if line.isascii() and compiled.search(line):
+            assert may_match(line.lower(), factors), (pattern, line, factors)
+
+
+def test_prefilter_does_not_change_matches():
+    rules = [(f"rule_{i}", pattern) for i, pattern in enumerate(ADVERSARIAL_PATTERNS)] + list(SQL_INJECTION_RULES.items())
+    filtered = SecurityPatternSet(rules, prefilter=True, keywords=KEYWORD_RULES)
+    unfiltered = SecurityPatternSet(rules, prefilter=False, keywords=KEYWORD_RULES)
+    for line in _lines(5000, seed=1):
+        assert filtered.scan(line, require_rule=False) == unfiltered.scan(line, require_rule=False), line
+        assert filtered.search(line) == unfiltered.search(line), line
@@ -0,0 +1,30 @@
+import io
+
+import pytest
+
+from log_sources import LineReader
+
+# Multi-byte UTF-8, CRLF endings, empty lines and a last line without a newline
+DATA = "first line\nsecond, déjà vu ✓\r\n\n日本語のログ\nno newline at the end".encode("utf-8")
+LINES = [b"first line", "second, déjà vu ✓".encode("utf-8"), b"", "日本語のログ".encode("utf-8"),
+         b"no newline at the end"]
+
+
+@pytest.mark.parametrize("chunk_size", range(1, len(DATA) + 2))
+def test_lines_do_not_depend_on_chunk_boundaries(chunk_size):
+    reader = LineReader(io.BytesIO(DATA), chunk_size)
+    assert list(reader) == LINES
+    assert reader.offset == len(DATA)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, len(DATA)])
+def test_decoded_lines_keep_multibyte_characters(chunk_size):
+    assert list(LineReader(io.BytesIO(DATA), chunk_size).decoded()) == [line.decode("utf-8") for line in LINES]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, len(DATA)])
+def test_partial_last_line_is_held_back(chunk_size):
+    reader = LineReader(io.BytesIO(DATA), chunk_size, include_partial=False)
+    assert list(reader) == LINES[:-1]
+    # The offset stops after the last newline, where the next read resumes
+    assert reader.offset == DATA.rindex(b"\n") + 1
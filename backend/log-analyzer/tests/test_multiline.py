@@ -0,0 +1,31 @@
+import threading
+
+from follow import IDLE, follow_file_lines
+from multiline import RecordAssembler
+
+
+def test_records_group_continuation_lines():
+    lines = ["ERROR request failed", "Traceback (most recent call last):", '  File "app.py", line 3', "ValueError: x",
+             "INFO next request"]
+    assert list(RecordAssembler.from_rule("indent").assemble(lines)) == ["\n".join(lines[:4]), lines[4]]
+
+
+def test_idle_poll_flushes_the_pending_record():
+    def followed():
+        yield "ERROR request failed"
+        yield "  at handler (app.js:10)"
+        yield IDLE.decode()
+        raise AssertionError("the record was held back until the next line")
+
+    records = RecordAssembler.from_rule("indent").assemble(followed())
+    assert next(records) == "ERROR request failed\n  at handler (app.js:10)"
+
+
+def test_follow_source_reports_idle_polls(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"first\nsecond\npartial")
+    stop = threading.Event()
+    lines = follow_file_lines(str(path), poll_interval=0.01, stop=stop)
+    assert [next(lines) for _ in range(3)] == [b"first", b"second", IDLE]
+    stop.set()
+    assert list(lines) == []
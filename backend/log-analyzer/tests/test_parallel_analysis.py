@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from local_s3 import LocalS3Client
+from log_analyzer import LogAnalyzer
+from report_sinks import ReportEvents
+
+BUCKET = "logs"
+KEY = "access.log"
+
+BENIGN = '203.0.113.{} - - [06/Apr/2025:02:14:{:02d} +0000] "GET /index.html?page={} HTTP/1.1" 200 532'
+ATTACK = '198.51.100.{} - - [06/Apr/2025:02:15:{:02d} +0000] "GET /items?id={} UNION SELECT password FROM users HTTP/1.1" 200 91'
+
+
+def _analyzer(tmp_path, workers, **kwargs):
+    # Ranges much shorter than a line, so that most lines are split across ranges and blocks
+    return LogAnalyzer(BUCKET, KEY, s3_client=LocalS3Client(str(tmp_path)), security_patterns=[],
+                       workers=workers, range_size=64, fetch_workers=3, **kwargs)
+
+
+@pytest.fixture
+def lines(tmp_path):
+    generator = random.Random(0)
+    lines = [(ATTACK if generator.random() < 0.2 else BENIGN).format(index % 250, index % 60, index)
+             for index in range(300)]
+    (tmp_path / BUCKET).mkdir()
+    (tmp_path / BUCKET / KEY).write_text("\n".join(lines) + "\n")
+    return lines
+
+
+def test_parallel_scan_matches_the_sequential_scan(tmp_path, lines):
+    sequential = _analyzer(tmp_path, workers=1).analyze_logs()
+    parallel = _analyzer(tmp_path, workers=2).analyze_logs()
+    # One scan per block, so the parallel path was taken
+    assert parallel.metrics.histograms["scan_seconds"].count > 1
+    assert parallel.raw_logs == sequential.raw_logs
+    assert parallel.raw_logs == [line for line in lines if "UNION SELECT" in line]
+    assert [entry["severity"] for entry in parallel] == [entry["severity"] for entry in sequential]
+
+
+def test_parallel_scan_streams_blocks_to_a_sink_in_order(tmp_path, lines):
+    sequential = _analyzer(tmp_path, workers=1).analyze_logs()
+    events = []
+
+    class Sink:
+        def write_event(self, event):
+            events.append(event["raw"])
+
+    report_events = ReportEvents([Sink()])
+    assert _analyzer(tmp_path, workers=2).analyze_logs(sink=report_events) is report_events
+    assert events == sequential.raw_logs
+    assert report_events.line_count() == len(sequential)
+
+
+def test_parallel_scan_with_templates_counts_every_line(tmp_path, lines):
+    sequential = _analyzer(tmp_path, workers=1).analyze_logs()
+    parallel = _analyzer(tmp_path, workers=2, max_templates=100).analyze_logs()
+    assert parallel.line_count() == len(sequential)
+    assert len(parallel) < len(sequential)
+
+
+def test_empty_object_gives_no_entries(tmp_path):
+    (tmp_path / BUCKET).mkdir()
+    (tmp_path / BUCKET / KEY).write_bytes(b"")
+    batch = _analyzer(tmp_path, workers=2).analyze_logs()
+    assert len(batch) == 0
+    assert batch.line_count() == 0
@@ -0,0 +1,63 @@
+import pickle
+
+from parsed_log_batch import ParsedLogBatch
+
+METADATA = {"format": "apache", "security_patterns": ["UNION SELECT"]}
+
+ENTRIES = [
+    {"raw_log": "first", "extracted_data": {"client_ip": "10.0.0.1", "status": "200"}, "metadata": METADATA,
+     "severity": "HIGH", "potential_threat": "SQL injection"},
+    # A field missing from an entry stays missing, while a present None stays None
+    {"raw_log": "second", "extracted_data": {"client_ip": None}, "metadata": METADATA},
+    {"raw_log": "third", "extracted_data": {"status": "404", "user": "admin"}, "metadata": METADATA,
+     "severity": "LOW", "template": "<*> GET /"},
+]
+
+
+def _batch(entries):
+    batch = ParsedLogBatch(METADATA)
+    for entry in entries:
+        batch.append(entry)
+    return batch
+
+
+def test_entries_round_trip():
+    batch = _batch(ENTRIES)
+    assert len(batch) == len(ENTRIES)
+    assert list(batch) == ENTRIES
+    assert batch[2] == ENTRIES[2]
+
+
+def test_entries_survive_pickling():
+    batch = pickle.loads(pickle.dumps(_batch(ENTRIES)))
+    assert list(batch) == ENTRIES
+
+
+def test_extend_appends_the_other_batch():
+    batch = _batch(ENTRIES[:1])
+    batch.extend(_batch(ENTRIES[1:]))
+    assert list(batch) == ENTRIES
+
+
+def test_equal_values_of_different_types_stay_apart():
+    values = [True, 1, 1.0, "1", 0, False, 0.0, None]
+    batch = _batch({"raw_log": str(i), "extracted_data": {"value": value}, "metadata": METADATA}
+                   for i, value in enumerate(values))
+    decoded = [entry["extracted_data"]["value"] for entry in batch]
+    assert decoded == values
+    assert [type(value) for value in decoded] == [type(value) for value in values]
+
+
+def test_unhashable_values_fall_back_to_a_plain_column():
+    values = ["a", {"nested": [1, 2]}, "a", [3]]
+    batch = _batch({"raw_log": str(i), "extracted_data": {"value": value}, "metadata": METADATA}
+                   for i, value in enumerate(values))
+    batch.append({"raw_log": "absent", "extracted_data": {}, "metadata": METADATA})
+    assert [entry["extracted_data"].get("value", "<absent>") for entry in batch] == values + ["<absent>"]
+
+
+def test_to_columns():
+    columns = _batch(ENTRIES).to_columns()
+    assert columns["raw"] == ["first", "second", "third"]
+    assert columns["columns"]["client_ip"] == ["10.0.0.1", None, None]
+    assert columns["insights"]["severity"] == ["HIGH", None, "LOW"]
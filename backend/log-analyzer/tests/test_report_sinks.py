@@ -0,0 +1,133 @@
+import json
+import logging
+
+from local_s3 import LocalS3Client
+from log_analyzer import LogAnalyzer
+from parsed_log_batch import ParsedLogBatch
+from report_sinks import ReportEvents, ReportSink
+
+BUCKET = "logs"
+
+BENIGN = '203.0.113.45 - - [06/Apr/2025:02:14:{:02d} +0000] "GET /index.html HTTP/1.1" 200 532'
+ATTACK = '198.51.100.7 - - [06/Apr/2025:02:15:{:02d} +0000] "GET /items?id=1 UNION SELECT password FROM users HTTP/1.1" 200 91'
+
+
+class RecordingSink(ReportSink):
+    def __init__(self):
+        self.events = []
+        self.summaries = []
+        self.closed = False
+
+    def write_event(self, event):
+        self.events.append(event)
+
+    def write_summary(self, summary):
+        self.summaries.append(summary)
+
+    def close(self):
+        self.closed = True
+
+
+def _analyzer(tmp_path, key="access.log", **kwargs):
+    return LogAnalyzer(BUCKET, key, s3_client=LocalS3Client(str(tmp_path)), security_patterns=[], **kwargs)
+
+
+def _write(tmp_path, key, lines):
+    path = tmp_path / BUCKET / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n")
+
+
+def _entry(raw_log, template=None, severity="high"):
+    entry = {"raw_log": raw_log, "extracted_data": {}, "metadata": {"format": "clf"}, "severity": severity}
+    if template is not None:
+        entry["template"] = template
+    return entry
+
+
+def test_events_are_logged_without_sinks(tmp_path, caplog):
+    _write(tmp_path, "access.log", [BENIGN.format(0), ATTACK.format(0)])
+    with caplog.at_level(logging.INFO, logger="report_sinks"):
+        summary = _analyzer(tmp_path).run_analysis("custom")
+    logged = [record.getMessage() for record in caplog.records if record.name == "report_sinks"]
+    assert summary["critical_events"] == 1
+    assert len(logged) == 1
+    assert json.loads(logged[0].split(": ", 1)[1])["raw"] == ATTACK.format(0)
+
+
+def test_events_reach_the_sinks_during_the_scan(tmp_path):
+    sink = RecordingSink()
+    seen_while_scanning = []
+
+    def lines():
+        for second in range(5):
+            yield BENIGN.format(second)
+        yield ATTACK.format(0)
+        yield BENIGN.format(10)
+        seen_while_scanning.append(len(sink.events))
+        yield ATTACK.format(1)
+
+    events = ReportEvents([sink])
+    assert _analyzer(tmp_path).analyze_logs(lines=lines(), sink=events) is events
+    assert seen_while_scanning == [1]
+    assert [event["raw"] for event in sink.events] == [ATTACK.format(0), ATTACK.format(1)]
+    assert events.line_count() == 2
+
+
+def test_run_analysis_writes_events_then_summary(tmp_path):
+    _write(tmp_path, "access.log", [ATTACK.format(second) for second in range(3)] + [BENIGN.format(0)])
+    sink = RecordingSink()
+    summary = _analyzer(tmp_path).run_analysis("custom", sinks=[sink])
+    assert len(sink.events) == 3
+    assert sink.summaries == [summary]
+    assert summary["critical_events"] == 3
+    assert sink.closed
+
+
+def test_template_entries_are_written_with_their_line_count():
+    sink = RecordingSink()
+    events = ReportEvents([sink])
+    events.append(_entry("a 1", template="a 0"))
+    events.append(_entry("b", severity="medium"))
+    assert [event["raw"] for event in sink.events] == ["b"]
+    assert events.templates() == ["a 0"]
+    events.template_counts["a 0"] = 4
+    assert len(events) == 2
+    assert events.line_count() == 5
+    assert events.lines_by_severity() == {"high": 4, "medium": 1}
+
+    events.flush()
+    assert sink.events[1] == {"raw": "a 1", "data": {}, "metadata": {"format": "clf"}, "template": "a 0", "count": 4}
+    assert events.line_count() == 5
+
+
+def test_extend_folds_templates_across_blocks_and_tags_objects():
+    sink = RecordingSink()
+    events = ReportEvents([sink])
+    for count in (2, 3):
+        batch = ParsedLogBatch()
+        batch.append(_entry("a 1", template="a 0"))
+        batch.template_counts["a 0"] = count
+        batch.window_events.append({"type": "scan"})
+        events.extend(batch)
+    events.flush()
+    assert [(event["template"], event["count"]) for event in sink.events] == [("a 0", 5)]
+
+    batch = ParsedLogBatch()
+    batch.append(_entry("c"))
+    batch.window_events.append({"type": "brute_force"})
+    events.extend(batch, source="b.log")
+    assert sink.events[-1]["source"] == "b.log"
+    assert events.window_events[-1] == {"type": "brute_force", "source": "b.log"}
+    assert events.line_count() == 6
+
+
+def test_prefix_events_are_written_per_object(tmp_path):
+    _write(tmp_path, "logs/a.log", [BENIGN.format(0), ATTACK.format(0)])
+    _write(tmp_path, "logs/b.log", [BENIGN.format(1)])
+    _write(tmp_path, "logs/c.log", [ATTACK.format(1), ATTACK.format(2)])
+    sink = RecordingSink()
+    summary = _analyzer(tmp_path, s3_prefix="logs/").run_analysis("custom", sinks=[sink])
+    assert [event["source"] for event in sink.events] == ["logs/a.log", "logs/c.log", "logs/c.log"]
+    assert summary["critical_events"] == 3
+    assert summary["objects"]["critical_events_by_object"] == {"logs/a.log": 1, "logs/b.log": 0, "logs/c.log": 2}
@@ -0,0 +1,45 @@
+import pytest
+
+from local_s3 import LocalS3Client
+from log_analyzer import LogAnalyzer
+from pattern_cache import PatternCache
+
+BUCKET = "logs"
+
+LINE = '203.0.113.45 - - [06/Apr/2025:02:14:{:02d} +0000] "GET /etc/passwd HTTP/1.1" 200 532'
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    calls = []
+
+    def prompt_for_security_patterns(self, log_format):
+        calls.append(log_format)
+        return {"security_patterns": [r"/etc/passwd"]}
+
+    monkeypatch.setattr(LogAnalyzer, "prompt_for_security_patterns", prompt_for_security_patterns)
+    return calls
+
+
+def _write_objects(tmp_path, count):
+    (tmp_path / BUCKET / "logs").mkdir(parents=True)
+    for index in range(count):
+        (tmp_path / BUCKET / "logs" / f"{index}.log").write_text(LINE.format(index) + "\n")
+
+
+@pytest.mark.parametrize("with_cache", [False, True])
+def test_patterns_are_generated_once_per_format_for_the_run(tmp_path, prompts, with_cache):
+    _write_objects(tmp_path, 4)
+    pattern_cache = PatternCache(str(tmp_path / "patterns.json")) if with_cache else None
+    analyzer = LogAnalyzer(BUCKET, None, s3_client=LocalS3Client(str(tmp_path)), s3_prefix="logs/",
+                           pattern_cache=pattern_cache)
+    result = analyzer.analyze_prefix()
+    assert len(prompts) == 1
+    assert result.stats()["objects_scanned"] == 4
+
+
+def test_returned_patterns_are_copies(tmp_path, prompts):
+    analyzer = LogAnalyzer(BUCKET, "a.log", s3_client=LocalS3Client(str(tmp_path)))
+    analyzer.security_patterns_for_format("apache").append("mutated")
+    assert analyzer.security_patterns_for_format("apache") == [r"/etc/passwd"]
+    assert prompts == ["apache"]
@@ -0,0 +1,120 @@
+import math
+import random
+from collections import Counter
+
+from parsed_log_batch import ParsedLogBatch
+from prefix_scan import PrefixScanResult
+from sketches import CountMinSketch, HyperLogLog, LogStatistics, SpaceSaving
+
+
+def _zipf_stream(count, distinct, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, distinct + 1)]
+    return [f"item-{index}" for index in rng.choices(range(distinct), weights, k=count)]
+
+
+def _check_space_saving(sketch, truth, total):
+    # Every item above total / capacity is tracked, and each count brackets the true one
+    for item, frequency in truth.items():
+        if frequency > total / sketch.capacity:
+            assert item in sketch.counts
+    for item, count in sketch.counts.items():
+        assert count - sketch.errors[item] <= truth[item] <= count
+
+
+def test_space_saving_tracks_heavy_hitters():
+    stream = _zipf_stream(50_000, 5_000)
+    sketch = SpaceSaving(capacity=100)
+    for item in stream:
+        sketch.add(item)
+    truth = Counter(stream)
+    assert len(sketch.counts) == 100
+    _check_space_saving(sketch, truth, len(stream))
+    assert [item for item, _, _ in sketch.top(3)] == [item for item, _ in truth.most_common(3)]
+
+
+def test_space_saving_merge():
+    stream = _zipf_stream(50_000, 5_000, seed=1)
+    left, right = SpaceSaving(capacity=100), SpaceSaving(capacity=100)
+    for item in stream[:20_000]:
+        left.add(item)
+    for item in stream[20_000:]:
+        right.add(item)
+    left.merge(right)
+    _check_space_saving(left, Counter(stream), len(stream))
+
+
+def test_count_min_never_undercounts():
+    stream = _zipf_stream(50_000, 5_000, seed=2)
+    sketch = CountMinSketch(width=2048, depth=4)
+    for item in stream:
+        sketch.add(item)
+    truth = Counter(stream)
+    # Overestimate bounded by e * n / width with probability 1 - e^-depth per item
+    bound = math.e * len(stream) / sketch.width
+    excess = [sketch.estimate(item) - frequency for item, frequency in truth.items()]
+    assert min(excess) >= 0
+    assert sum(1 for value in excess if value > bound) <= 0.05 * len(truth)
+
+
+def test_count_min_merge_equals_single_sketch():
+    stream = _zipf_stream(10_000, 1_000, seed=3)
+    whole, left, right = CountMinSketch(), CountMinSketch(), CountMinSketch()
+    for item in stream:
+        whole.add(item)
+    for item in stream[:4_000]:
+        left.add(item)
+    for item in stream[4_000:]:
+        right.add(item)
+    left.merge(right)
+    assert left.rows == whole.rows
+
+
+def test_hyperloglog_accuracy():
+    for distinct in (100, 5_000, 200_000):
+        sketch = HyperLogLog()
+        for i in range(distinct):
+            sketch.add(f"10.{i >> 16}.{(i >> 8) & 255}.{i & 255}")
+        # 1.04 / sqrt(2**14) is about 0.8% standard error
+        assert abs(sketch.count() - distinct) <= 0.03 * distinct
+
+
+def test_hyperloglog_merge_counts_the_union():
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(30_000):
+        left.add(str(i))
+        union.add(str(i))
+    for i in range(20_000, 60_000):
+        right.add(str(i))
+        union.add(str(i))
+    left.merge(right)
+    assert left.registers == union.registers
+    assert abs(left.count() - 60_000) <= 0.03 * 60_000
+
+
+def _statistics(ips):
+    statistics = LogStatistics()
+    for ip in ips:
+        statistics.observe({"client_ip": ip, "request_url": "/"})
+    return statistics
+
+
+def test_log_statistics_merge_matches_a_single_pass():
+    ips = [item.replace("item-", "203.0.113.") for item in _zipf_stream(20_000, 150, seed=4)]
+    merged = _statistics(ips[:7_000])
+    merged.merge(_statistics(ips[7_000:]))
+    assert merged.summary() == _statistics(ips).summary()
+
+
+def test_prefix_scan_merges_statistics_as_objects_complete():
+    result = PrefixScanResult("logs", "app/")
+    for key, ips in [("app/a.log", ["10.0.0.1"] * 3), ("app/b.log", ["10.0.0.1", "10.0.0.2"]), ("app/c.log", [])]:
+        batch = ParsedLogBatch()
+        batch.statistics = _statistics(ips) if ips else None
+        result.add(key, batch)
+        # The per-object sketches are not kept once merged
+        assert batch.statistics is None
+    summary = result.statistics.summary()
+    assert summary["lines"] == 5
+    assert summary["distinct_client_ips"] == 2
+    assert summary["top_client_ips"][0] == {"value": "10.0.0.1", "count": 4, "max_error": 0}
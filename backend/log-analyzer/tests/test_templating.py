@@ -0,0 +1,77 @@
+import logging
+
+from local_s3 import LocalS3Client
+from log_analyzer import LogAnalyzer
+from templating import LogTemplater, template_key
+
+BUCKET = "logs"
+KEY = "access.log"
+
+LINE = '203.0.113.{} - - [06/Apr/2025:02:14:{:02d} +0000] "GET {} HTTP/1.1" {} 532'
+ATTACK = "/items?id=1 UNION SELECT password FROM users"
+
+
+def _analyzer(tmp_path, security_patterns=(), max_templates=100):
+    return LogAnalyzer(BUCKET, KEY, s3_client=LocalS3Client(str(tmp_path)),
+                       security_patterns=list(security_patterns), max_templates=max_templates)
+
+
+def _write(tmp_path, lines):
+    (tmp_path / BUCKET).mkdir(exist_ok=True)
+    (tmp_path / BUCKET / KEY).write_text("\n".join(lines) + "\n")
+
+
+def test_template_key_keeps_digit_positions():
+    assert template_key("10.0.0.12 took 350ms") == b"00.0.0.00 took 000ms"
+    assert template_key("status 200") == template_key("status 401")
+    assert template_key("id 7") != template_key("id 70")
+
+
+def test_templater_counts_the_lines_of_matched_templates():
+    templater = LogTemplater()
+    key = templater.add("GET /a 200")
+    assert key is not None
+    template = templater.matched(key)
+    assert templater.add("GET /a 404") is None
+    assert templater.add("GET /a 500") is None
+    assert templater.count(template) == 3
+
+
+def test_unmatched_templates_are_evicted_least_recently_used_first():
+    templater = LogTemplater(max_templates=2)
+    assert templater.add("a 1") is not None
+    assert templater.add("b 1") is not None
+    assert templater.add("a 2") is None
+    assert templater.add("c 1") is not None
+    # "b" was the least recently seen template, so it is evaluated again
+    assert templater.add("b 2") is not None
+    assert templater.add("c 2") is None
+
+
+def test_lines_of_a_template_are_evaluated_once_and_counted(tmp_path):
+    lines = [LINE.format(host, host, "/index.html", 200) for host in range(5)]
+    lines += [LINE.format(host, host, ATTACK, 200) for host in range(10, 14)]
+    batch = _analyzer(tmp_path).analyze_logs(lines=lines)
+    assert batch.templated
+    assert len(batch) == 1
+    assert batch.line_count() == 4
+    assert batch.metrics.counters["lines_deduplicated"] == 7
+
+
+def test_summary_reports_one_event_per_template(tmp_path):
+    _write(tmp_path, [LINE.format(host, host, ATTACK, 200) for host in range(6)] + [LINE.format(1, 1, "/", 200)])
+    summary = _analyzer(tmp_path).run_analysis("custom")
+    assert summary["critical_events"] == 6
+    assert summary["critical_templates"] == 1
+
+
+def test_rules_on_digits_disable_templates(tmp_path, caplog):
+    # A 200 and two 401s share a template; evaluating only the first line of the template
+    # would miss both 401s
+    lines = [LINE.format(1, 0, "/error", 200), LINE.format(2, 1, "/error", 401), LINE.format(3, 2, "/error", 401)]
+    _write(tmp_path, lines)
+    with caplog.at_level(logging.WARNING, logger="log_analyzer"):
+        summary = _analyzer(tmp_path, security_patterns=['" 40[13] ']).run_analysis("custom")
+    assert any("templates are disabled" in record.getMessage() for record in caplog.records)
+    assert summary["critical_events"] == 2
+    assert "critical_templates" not in summary
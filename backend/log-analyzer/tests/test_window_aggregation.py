@@ -0,0 +1,110 @@
+from window_aggregation import BruteForceDetector, ScanDetector, WindowedAggregator, parse_clf_time
+
+T0 = parse_clf_time("06/Apr/2025:02:14:00 +0000")
+
+
+def test_parse_clf_time_applies_the_offset():
+    assert parse_clf_time("06/Apr/2025:04:14:00 +0200") == T0
+    assert parse_clf_time("06/Apr/2025:02:14:01 +0000") == T0 + 1
+    assert parse_clf_time("not a time") is None
+    assert parse_clf_time(None) is None
+
+
+def test_brute_force_fires_once_per_burst():
+    detector = BruteForceDetector(window_seconds=60, threshold=3)
+    for second in range(5):
+        detector.observe("10.0.0.1", "/login", "401", T0 + second)
+    assert [event["type"] for event in detector.events] == ["brute_force"]
+    event = detector.events[0]
+    assert (event["client_ip"], event["path"], event["failures"], event["seconds"]) == ("10.0.0.1", "/login", 3, 2)
+
+
+def test_brute_force_counts_failures_per_client_and_path():
+    detector = BruteForceDetector(window_seconds=60, threshold=3)
+    detector.observe("10.0.0.1", "/login", "401", T0)
+    detector.observe("10.0.0.2", "/login", "401", T0 + 1)
+    detector.observe("10.0.0.1", "/admin", "403", T0 + 2)
+    detector.observe("10.0.0.1", "/login", "200", T0 + 3)
+    assert detector.events == []
+
+
+def test_success_after_failures_is_reported():
+    detector = BruteForceDetector(window_seconds=60, threshold=3)
+    for second in range(3):
+        detector.observe("10.0.0.1", "/login", "401", T0 + second)
+    detector.observe("10.0.0.1", "/login", "302", T0 + 8)
+    assert [event["type"] for event in detector.events] == ["brute_force", "brute_force_success"]
+    assert detector.events[1]["success_status"] == "302"
+    assert detector.events[1]["seconds"] == 8
+    # The window starts over after the success
+    detector.observe("10.0.0.1", "/login", "200", T0 + 9)
+    assert len(detector.events) == 2
+
+
+def test_failures_older_than_the_window_are_evicted():
+    detector = BruteForceDetector(window_seconds=10, threshold=3)
+    detector.observe("10.0.0.1", "/login", "401", T0)
+    detector.observe("10.0.0.1", "/login", "401", T0 + 5)
+    # The first failure is out of the window by now
+    detector.observe("10.0.0.1", "/login", "401", T0 + 12)
+    assert detector.events == []
+    detector.observe("10.0.0.1", "/login", "401", T0 + 14)
+    assert len(detector.events) == 1
+    assert detector.events[0]["first_seen"] == T0 + 5
+
+
+def test_brute_force_fires_again_after_the_window_empties():
+    detector = BruteForceDetector(window_seconds=10, threshold=2)
+    for second in (0, 1, 30, 31):
+        detector.observe("10.0.0.1", "/login", "401", T0 + second)
+    assert [event["first_seen"] for event in detector.events] == [T0, T0 + 30]
+
+
+def test_least_recently_seen_keys_are_evicted():
+    detector = BruteForceDetector(window_seconds=60, threshold=2, max_keys=2)
+    detector.observe("10.0.0.1", "/login", "401", T0)
+    detector.observe("10.0.0.2", "/login", "401", T0 + 1)
+    detector.observe("10.0.0.3", "/login", "401", T0 + 2)
+    assert list(detector.states) == [("10.0.0.2", "/login"), ("10.0.0.3", "/login")]
+    # The first client's failure was forgotten with its key
+    detector.observe("10.0.0.1", "/login", "401", T0 + 3)
+    assert detector.events == []
+
+
+def test_scan_counts_distinct_missing_paths():
+    detector = ScanDetector(window_seconds=60, threshold=4)
+    for second, path in enumerate(["/a", "/a", "/b", "/robots.txt"]):
+        detector.observe("10.0.0.9", path, "404", T0 + second)
+    detector.observe("10.0.0.9", "/c", "200", T0 + 5)
+    assert detector.events == []
+    detector.observe("10.0.0.9", "/c", "404", T0 + 6)
+    assert len(detector.events) == 1
+    assert detector.events[0]["distinct_paths"] == 4
+
+
+def test_scan_paths_expire_with_the_window():
+    detector = ScanDetector(window_seconds=10, threshold=3)
+    detector.observe("10.0.0.9", "/a", "404", T0)
+    detector.observe("10.0.0.9", "/b", "404", T0 + 5)
+    detector.observe("10.0.0.9", "/c", "404", T0 + 12)
+    assert detector.events == []
+    assert set(detector.states["10.0.0.9"]["paths"]) == {"/b", "/c"}
+    detector.observe("10.0.0.9", "/d", "404", T0 + 13)
+    assert len(detector.events) == 1
+
+
+def test_aggregator_orders_events_by_log_time():
+    aggregator = WindowedAggregator(detectors=[BruteForceDetector(threshold=2), ScanDetector(threshold=2)])
+    lines = [
+        ("10.0.0.9", "/x?q=1", "404", "06/Apr/2025:02:14:00 +0000"),
+        ("10.0.0.1", "/login", "401", "06/Apr/2025:02:14:01 +0000"),
+        ("10.0.0.1", "/login", "401", "06/Apr/2025:02:14:02 +0000"),
+        ("10.0.0.9", "/y", "404", "06/Apr/2025:02:14:03 +0000"),
+        ("10.0.0.5", "/", "404", "not a time"),
+    ]
+    for client_ip, url, status, request_time in lines:
+        aggregator.observe({"client_ip": client_ip, "request_url": url, "http_status_code": status,
+                            "request_time": request_time})
+    aggregator.observe({})
+    assert [event["type"] for event in aggregator.events] == ["brute_force", "scan"]
+    assert aggregator.events[1]["distinct_paths"] == 2
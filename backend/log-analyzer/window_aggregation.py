@@ -0,0 +1,189 @@
+import calendar
+from collections import Counter, OrderedDict, deque
+from typing import Callable, Dict, Hashable, List, Optional
+
+_MONTHS = {name: number for number, name in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+
+DEFAULT_MAX_KEYS = 100000
+
+
+def parse_clf_time(value: str) -> Optional[float]:
+    """Convert a CLF timestamp such as '06/Apr/2025:02:14:01 +0000' to epoch seconds"""
+    try:
+        day, month, year = int(value[0:2]), _MONTHS[value[3:6]], int(value[7:11])
+        hour, minute, second = int(value[12:14]), int(value[15:17]), int(value[18:20])
+        sign = -1 if value[21] == "-" else 1
+        offset = sign * (int(value[22:24]) * 3600 + int(value[24:26]) * 60)
+    except (KeyError, ValueError, IndexError, TypeError):
+        return None
+    return calendar.timegm((year, month, day, hour, minute, second)) - offset
+
+
+class _WindowedKeys:
+    """
+    Per-key sliding windows with bounded memory.
+
+    Keys are kept in LRU order and the least recently seen key is evicted once more than
+    `max_keys` are tracked, so a flood of one-off IPs cannot grow the state without bound.
+    Entries older than the window (in log time, not wall-clock time) are dropped on access.
+    """
+
+    def __init__(self, window_seconds: float, max_keys: int = DEFAULT_MAX_KEYS,
+                 on_event: Optional[Callable[[Dict], None]] = None):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self.on_event = on_event
+        self.events: List[Dict] = []
+        self.states: "OrderedDict[Hashable, Dict]" = OrderedDict()
+
+    def _emit(self, event: Dict):
+        self.events.append(event)
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def _new_state(self) -> Dict:
+        return {"window": deque(), "alerted": False}
+
+    def state(self, key: Hashable, timestamp: float, create: bool = True) -> Optional[Dict]:
+        state = self.states.get(key)
+        if state is None:
+            if not create:
+                return None
+            state = self.states[key] = self._new_state()
+            if len(self.states) > self.max_keys:
+                self.states.popitem(last=False)
+        else:
+            self.states.move_to_end(key)
+        window = state["window"]
+        horizon = timestamp - self.window_seconds
+        while window and window[0][0] < horizon:
+            self._expire(state, window.popleft())
+        if not window:
+            state["alerted"] = False
+        return state
+
+    def _expire(self, state: Dict, item):
+        pass
+
+
+class BruteForceDetector(_WindowedKeys):
+    """
+    Repeated authentication failures from one client against one path.
+
+    Emits "brute_force" once `threshold` failures fall within the window, and
+    "brute_force_success" when a success follows at least `threshold` failures
+    (e.g. 3 failed logins in 8 seconds followed by a 200).
+    """
+
+    def __init__(self, window_seconds: float = 60, threshold: int = 3, max_keys: int = DEFAULT_MAX_KEYS,
+                 failure_statuses=("401", "403"), on_event: Optional[Callable[[Dict], None]] = None):
+        super().__init__(window_seconds, max_keys, on_event)
+        self.threshold = threshold
+        self.failure_statuses = frozenset(failure_statuses)
+
+    def observe(self, client_ip: str, path: str, status: str, timestamp: float):
+        key = (client_ip, path)
+        if status in self.failure_statuses:
+            state = self.state(key, timestamp)
+            state["window"].append((timestamp,))
+            if len(state["window"]) >= self.threshold and not state["alerted"]:
+                state["alerted"] = True
+                self._emit(self._event("brute_force", key, state["window"], timestamp))
+        elif status[:1] in ("2", "3"):
+            state = self.state(key, timestamp, create=False)
+            if state is not None and len(state["window"]) >= self.threshold:
+                self._emit(self._event("brute_force_success", key, state["window"], timestamp, status))
+                state["window"].clear()
+                state["alerted"] = False
+
+    def _event(self, event_type, key, window, timestamp, status=None):
+        client_ip, path = key
+        event = {
+            "type": event_type,
+            "severity": "high",
+            "client_ip": client_ip,
+            "path": path,
+            "failures": len(window),
+            "seconds": timestamp - window[0][0],
+            "first_seen": window[0][0],
+            "last_seen": timestamp,
+        }
+        if status is not None:
+            event["success_status"] = status
+        return event
+
+
+class ScanDetector(_WindowedKeys):
+    """One client requesting many distinct missing paths (404s) within the window"""
+
+    def __init__(self, window_seconds: float = 60, threshold: int = 10, max_keys: int = DEFAULT_MAX_KEYS,
+                 on_event: Optional[Callable[[Dict], None]] = None):
+        super().__init__(window_seconds, max_keys, on_event)
+        self.threshold = threshold
+
+    def _new_state(self):
+        state = super()._new_state()
+        state["paths"] = Counter()
+        return state
+
+    def _expire(self, state, item):
+        _, path = item
+        paths = state["paths"]
+        paths[path] -= 1
+        if not paths[path]:
+            del paths[path]
+
+    def observe(self, client_ip: str, path: str, status: str, timestamp: float):
+        if status != "404":
+            return
+        state = self.state(client_ip, timestamp)
+        state["window"].append((timestamp, path))
+        state["paths"][path] += 1
+        if len(state["paths"]) >= self.threshold and not state["alerted"]:
+            state["alerted"] = True
+            self._emit({
+                "type": "scan",
+                "severity": "medium",
+                "client_ip": client_ip,
+                "distinct_paths": len(state["paths"]),
+                "seconds": timestamp - state["window"][0][0],
+                "first_seen": state["window"][0][0],
+                "last_seen": timestamp,
+            })
+
+
+class WindowedAggregator:
+    """
+    Streaming aggregation stage fed with every parsed line of a CLF/combined log.
+
+    Runs the brute-force and scan detectors in a single pass. Lines without a client,
+    status or parseable timestamp are ignored.
+    """
+
+    def __init__(self, detectors=None, on_event: Optional[Callable[[Dict], None]] = None):
+        self.detectors = detectors if detectors is not None else [
+            BruteForceDetector(on_event=on_event),
+            ScanDetector(on_event=on_event),
+        ]
+
+    def observe(self, extracted_data: Optional[Dict]):
+        if not extracted_data:
+            return
+        client_ip = extracted_data.get("client_ip")
+        status = extracted_data.get("http_status_code")
+        timestamp = parse_clf_time(extracted_data.get("request_time"))
+        if client_ip is None or status is None or timestamp is None:
+            return
+        path = (extracted_data.get("request_url") or "").split("?", 1)[0]
+        for detector in self.detectors:
+            detector.observe(client_ip, path, status, timestamp)
+
+    def collect(self, critical_entries):
+        critical_entries.window_events.extend(self.events)
+
+    @property
+    def events(self) -> List[Dict]:
+        events = [event for detector in self.detectors for event in detector.events]
+        events.sort(key=lambda event: event["last_seen"])
+        return events